@@ -1,7 +1,13 @@
 from django.contrib import admin
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
 from .models import (
     UserProfile, UserHistory, EcoAction, Category, Upload, Feedback,
-    VisitTracker, ContactMessage, SiteSettings, TeamMember, SearchLog
+    VisitTracker, ContactMessage, SiteSettings, TeamMember, SearchLog, ActivityRollup,
+    SearchQueryCount, RequestProfile, SlowQuery, Task
 )
 
 @admin.register(UserProfile)
@@ -48,3 +54,109 @@ class TeamMemberAdmin(admin.ModelAdmin):
 @admin.register(SearchLog)
 class SearchLogAdmin(admin.ModelAdmin):
     list_display = ('query', 'user', 'searched_at')
+
+@admin.register(SearchQueryCount)
+class SearchQueryCountAdmin(admin.ModelAdmin):
+    list_display = ('query', 'count', 'last_searched')
+    search_fields = ('query',)
+    ordering = ('-count',)
+
+@admin.register(ActivityRollup)
+class ActivityRollupAdmin(admin.ModelAdmin):
+    list_display = ('user', 'period', 'period_start', 'login_days', 'visits')
+    list_filter = ('period',)
+    date_hierarchy = 'period_start'
+    list_select_related = ('user',)
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'view_name', 'status_code', 'duration_ms', 'query_count', 'mode', 'user')
+    list_filter = ('mode', 'view_name', 'status_code')
+    search_fields = ('path', 'view_name')
+    date_hierarchy = 'created_at'
+    list_select_related = ('user',)
+    exclude = ('report', 'queries', 'stats')
+    readonly_fields = (
+        'created_at', 'user', 'method', 'path', 'view_name', 'status_code', 'mode', 'duration',
+        'query_count', 'query_time', 'stats_download', 'profile_report', 'sql_log',
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Duration (ms)', ordering='duration')
+    def duration_ms(self, obj):
+        return round(obj.duration * 1000, 1)
+
+    @admin.display(description='Report')
+    def profile_report(self, obj):
+        return format_html('<pre style="white-space: pre; overflow-x: auto">{}</pre>', obj.report)
+
+    @admin.display(description='SQL')
+    def sql_log(self, obj):
+        return format_html_join('', '<p><strong>{} ms</strong> <code>{}</code><br><small>{}</small></p>', (
+            (query['ms'], query['sql'], ' \u2192 '.join(query['stack'])) for query in obj.queries
+        ))
+
+    @admin.display(description='pstats file')
+    def stats_download(self, obj):
+        if not obj.stats:
+            return '-'
+        url = reverse('admin:ecoapp_requestprofile_stats', args=[obj.pk])
+        return format_html('<a href="{}">profile-{}.prof</a>', url, obj.pk)
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/stats/', self.admin_site.admin_view(self.stats_view), name='ecoapp_requestprofile_stats'),
+        ] + super().get_urls()
+
+    def stats_view(self, request, pk):
+        if not self.has_view_permission(request):
+            raise Http404
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        if not profile.stats:
+            raise Http404
+        response = HttpResponse(bytes(profile.stats), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile.pk}.prof"'
+        return response
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ('short_sql', 'view_name', 'requests', 'executions', 'slow_executions', 'total_ms', 'max_ms', 'max_per_request', 'last_seen')
+    list_filter = ('view_name',)
+    search_fields = ('sql', 'view_name')
+    ordering = ('-total_time',)
+    readonly_fields = [field.name for field in SlowQuery._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='SQL')
+    def short_sql(self, obj):
+        return obj.sql[:120]
+
+    @admin.display(description='Total (ms)', ordering='total_time')
+    def total_ms(self, obj):
+        return round(obj.total_time * 1000, 1)
+
+    @admin.display(description='Max (ms)', ordering='max_time')
+    def max_ms(self, obj):
+        return round(obj.max_time * 1000, 1)
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('locked_by', 'locked_at', 'last_error', 'created_at')
+    actions = ['retry_now']
+
+    @admin.action(description='Queue selected tasks to run now')
+    def retry_now(self, request, queryset):
+        count = queryset.exclude(status=Task.RUNNING).update(status=Task.QUEUED, run_at=timezone.now(), attempts=0, locked_by='')
+        self.message_user(request, f"{count} tasks queued.")
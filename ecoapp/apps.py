@@ -6,3 +6,4 @@ class EcoappConfig(AppConfig):
 
     def ready(self):
         import ecoapp.signals
+        import ecoapp.tasks
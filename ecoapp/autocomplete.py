@@ -0,0 +1,129 @@
+import bisect
+import heapq
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Max
+
+from .models import SearchLog, SearchQueryCount
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query):
+    return ' '.join(query.lower().split())
+
+
+class QueryIndex:
+    """Sorted array of normalized queries with their frequencies, for prefix lookups."""
+
+    def __init__(self, counts):
+        self.queries = sorted(counts)
+        self.counts = [counts[query] for query in self.queries]
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.queries)
+
+    def suggest(self, prefix, limit=10):
+        prefix = normalize_query(prefix)
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self.queries, prefix)
+        # The highest code point, so continuations outside the BMP (emoji) are kept too.
+        end = bisect.bisect_left(self.queries, prefix + chr(0x10FFFF), lo=start)
+        best = heapq.nlargest(limit, range(start, end), key=self.counts.__getitem__)
+        return [self.queries[i] for i in best]
+
+
+def load_query_counts(max_queries, min_count=1):
+    """
+    Normalized query -> times searched. Queries seen fewer than ``min_count`` times are
+    left out: rare ones can be private text (upload titles, names) of a single user.
+    """
+    counts = Counter()
+    for query, count in SearchQueryCount.objects.values_list('query', 'count').iterator():
+        counts[query] += count
+    recent = SearchLog.objects.values_list('query').annotate(total=Count('id')).order_by()
+    for query, total in recent.iterator():
+        normalized = normalize_query(query)
+        if normalized:
+            counts[normalized] += total
+    return {query: count for query, count in counts.most_common(max_queries) if count >= min_count}
+
+
+_index = None
+_refreshing = threading.Lock()
+
+
+def refresh_query_index():
+    global _index
+    _index = QueryIndex(load_query_counts(settings.AUTOCOMPLETE_MAX_QUERIES, settings.AUTOCOMPLETE_MIN_COUNT))
+    return _index
+
+
+def _refresh_in_background():
+    try:
+        refresh_query_index()
+    except Exception:
+        logger.exception("Refreshing the autocomplete index failed")
+    finally:
+        close_old_connections()
+        _refreshing.release()
+
+
+def get_query_index():
+    """
+    Return the current index. Only the very first call builds it inline; after that a
+    stale index keeps answering while a background thread replaces it.
+    """
+    index = _index
+    if index is None:
+        return refresh_query_index()
+    if time.monotonic() - index.built_at > settings.AUTOCOMPLETE_REFRESH_INTERVAL:
+        if _refreshing.acquire(blocking=False):
+            threading.Thread(target=_refresh_in_background, name='autocomplete-refresh', daemon=True).start()
+    return index
+
+
+def fold_search_counts(ids):
+    """Add the SearchLog rows ``ids`` to SearchQueryCount (the caller deletes them)."""
+    counts = Counter()
+    last_seen = {}
+    rows = SearchLog.objects.filter(pk__in=ids).values_list('query').annotate(total=Count('id'), last=Max('searched_at')).order_by()
+    for query, total, last in rows:
+        normalized = normalize_query(query)
+        if not normalized:
+            continue
+        counts[normalized] += total
+        last_seen[normalized] = max(last, last_seen.get(normalized, last))
+    with transaction.atomic():
+        existing = SearchQueryCount.objects.in_bulk(list(counts), field_name='query')
+        for query, total in counts.items():
+            if query in existing:
+                row = existing[query]
+                row.count += total
+                row.last_searched = max(row.last_searched, last_seen[query])
+            else:
+                existing[query] = SearchQueryCount(query=query, count=total, last_searched=last_seen[query])
+        new_rows = [row for row in existing.values() if row.pk is None]
+        old_rows = [row for row in existing.values() if row.pk is not None]
+        SearchQueryCount.objects.bulk_create(new_rows)
+        SearchQueryCount.objects.bulk_update(old_rows, ['count', 'last_searched'], batch_size=500)
+
+
+def compact_search_log(before, chunk_size=5000):
+    """Fold SearchLog rows older than ``before`` into SearchQueryCount and delete them."""
+    compacted = 0
+    while True:
+        ids = list(SearchLog.objects.filter(searched_at__lt=before).order_by('searched_at', 'pk').values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return compacted
+        with transaction.atomic():
+            fold_search_counts(ids)
+            SearchLog.objects.filter(pk__in=ids).delete()
+        compacted += len(ids)
@@ -0,0 +1,150 @@
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+
+from . import urls as ecoapp_urls
+from .counters import flush_all
+from .datagen import generate_data, rebuild_derived
+from .models import EcoAction, Event, TeamMember
+
+User = get_user_model()
+
+# Rows in each main table (actions, events, searches...) per named scale.
+SCALES = {
+    '1k': 1000,
+    '100k': 100000,
+    '1m': 1000000,
+}
+
+# Which object fills the <pk> of a route, and extra query strings for routes that need input.
+ROUTE_OBJECTS = {
+    'action_detail': EcoAction,
+    'event_detail': Event,
+    'team_member_edit': TeamMember,
+    'team_delete': TeamMember,
+}
+ROUTE_QUERY = {
+    'search': '?query=compost',
+    'search_autocomplete': '?q=co',
+}
+
+BENCHMARK_USERNAME = 'benchmark-staff'
+
+
+def seed_scale(scale, seed=0, log=None):
+    rows = SCALES[scale]
+    counts = generate_data(
+        users=max(rows // 20, 10), actions=rows, events=rows, uploads=rows // 2,
+        logins=rows, searches=rows, seed=seed, prefix=f'bench-{scale}', log=log,
+    )
+    TeamMember.objects.bulk_create([TeamMember(name=f'Member {i}', role='Volunteer') for i in range(12)])
+    rebuild_derived()
+    return counts
+
+
+def benchmark_user():
+    user, _ = User.objects.get_or_create(username=BENCHMARK_USERNAME, defaults={'is_staff': True})
+    return user
+
+
+def route_urls(namespace='ecoapp'):
+    """``[(name, url)]`` for every named route; routes whose arguments can't be filled are skipped."""
+    routes = []
+    for pattern in ecoapp_urls.urlpatterns:
+        if not isinstance(pattern, URLPattern) or not pattern.name:
+            continue
+        kwargs = {}
+        if pattern.pattern.converters:
+            model = ROUTE_OBJECTS.get(pattern.name)
+            obj = model._default_manager.order_by('pk').first() if model else None
+            if obj is None:
+                continue
+            kwargs = {'pk': obj.pk}
+        url = reverse(f'{namespace}:{pattern.name}', kwargs=kwargs) + ROUTE_QUERY.get(pattern.name, '')
+        routes.append((pattern.name, url))
+    return routes
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def benchmark_url(client, url, iterations=20, warmup=2):
+    """Latency percentiles (ms), queries per request and peak traced memory (KiB) for one URL."""
+    for _ in range(warmup):
+        client.get(url)
+    timings = []
+    queries = []
+    status = None
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured.captured_queries))
+        status = response.status_code
+    # tracemalloc slows everything down, so memory gets its own request.
+    tracemalloc.start()
+    try:
+        client.get(url)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'status': status,
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'queries': max(queries),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(iterations=20, warmup=2, routes=None, log=None):
+    client = Client()
+    client.force_login(benchmark_user())
+    results = {}
+    try:
+        for name, url in route_urls():
+            if routes and name not in routes:
+                continue
+            results[name] = {'url': url, **benchmark_url(client, url, iterations, warmup)}
+            if log:
+                result = results[name]
+                log(f"{name:<26} {result['status']}  p50 {result['p50_ms']:>8.2f} ms  p95 {result['p95_ms']:>8.2f} ms  "
+                    f"{result['queries']:>3} queries  {result['peak_kib']:>8.1f} KiB")
+    finally:
+        # Write the coalesced view counts while the benchmarked database is still there.
+        flush_all()
+    return results
+
+
+def compare(results, baseline, threshold=1.25):
+    """
+    Regressions against ``baseline``: p95 latency or peak memory above ``threshold``
+    times the baseline, or any extra query.
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if result['queries'] > before['queries']:
+            regressions.append(f"{name}: {result['queries']} queries (baseline {before['queries']})")
+        for metric in ('p95_ms', 'peak_kib'):
+            if before[metric] and result[metric] > before[metric] * threshold:
+                regressions.append(f"{name}: {metric} {result[metric]} (baseline {before[metric]}, limit x{threshold})")
+    return regressions
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)['routes']
@@ -0,0 +1,204 @@
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.messages.storage.session import SessionStorage
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from .autocomplete import normalize_query
+from .models import SiteSettings
+from .pagination import wants_fragment
+
+_MISSING = object()
+
+# SiteSettings singleton: a short-lived per-process copy in front of the shared cache.
+# A save clears both layers in the saving process; other workers see the change once
+# their local copy expires (SITE_SETTINGS_LOCAL_TTL), or after the shared entry times out
+# (SITE_SETTINGS_CACHE_TIMEOUT) when the cache backend is not shared between processes.
+SITE_SETTINGS_CACHE_KEY = 'ecoapp:site_settings'
+_site_settings_local = (_MISSING, 0.0)
+
+
+def get_site_settings():
+    global _site_settings_local
+    value, expires = _site_settings_local
+    now = time.monotonic()
+    if value is not _MISSING and now < expires:
+        return value
+    value = cache.get(SITE_SETTINGS_CACHE_KEY, _MISSING)
+    if value is _MISSING:
+        value = SiteSettings.objects.first()
+        cache.set(SITE_SETTINGS_CACHE_KEY, value, settings.SITE_SETTINGS_CACHE_TIMEOUT)
+    _site_settings_local = (value, now + settings.SITE_SETTINGS_LOCAL_TTL)
+    return value
+
+
+def invalidate_site_settings():
+    global _site_settings_local
+    cache.delete(SITE_SETTINGS_CACHE_KEY)
+    _site_settings_local = (_MISSING, 0.0)
+
+
+class SearchResultCache:
+    """
+    Per-process LRU of search result id lists with a TTL.
+
+    Entries live in a scope (one per model, plus one per user for owned models) and are
+    keyed on the normalized query. Invalidating a scope bumps its generation, so every
+    older entry in it simply stops matching and ages out of the LRU.
+    """
+
+    def __init__(self, max_entries=1000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._generations = Counter()
+        self._lock = threading.Lock()
+
+    def get(self, scope, query, limit=None):
+        """
+        Return ``(key, ids)``; ``ids`` is None on a miss. Pass the key back to ``set`` so a
+        result computed across an invalidation is stored under the old generation.
+        """
+        now = time.monotonic()
+        with self._lock:
+            key = (scope, self._generations[scope], normalize_query(query), limit)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return key, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return key, None
+
+    def set(self, key, ids):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, tuple(ids))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, scope):
+        with self._lock:
+            self._generations[scope] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+search_cache = SearchResultCache(settings.SEARCH_CACHE_MAX_ENTRIES, settings.SEARCH_CACHE_TTL)
+
+
+# Public page cache. Every cached page is keyed on the current generation of the models
+# it renders (SiteSettings always, through the context processor); saving or deleting one
+# of those models replaces its generation in the shared cache, so older pages stop matching.
+PAGE_CACHE_PREFIX = 'ecoapp:page'
+
+
+def generation_key(model):
+    return f'ecoapp:generation:{model._meta.label_lower}'
+
+
+def bump_generation(model):
+    # A fresh token rather than incr(): an evicted counter restarting at 1 could revive old pages.
+    cache.set(generation_key(model), time.time_ns(), None)
+
+
+def get_generations(models):
+    keys = [generation_key(model) for model in models]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def has_pending_messages(request):
+    return CookieStorage.cookie_name in request.COOKIES or SessionStorage.session_key in request.session
+
+
+def page_cache_key(request, models):
+    """
+    Anonymous visitors share one variant per URL. Signed-in users get their own variant,
+    tied to their CSRF secret because the navbar's logout form embeds a token.
+    """
+    if request.user.is_authenticated:
+        secret = request.META.get('CSRF_COOKIE', '')
+        variant = f'user:{request.user.pk}:{hashlib.md5(secret.encode()).hexdigest()}'
+    else:
+        variant = 'anon'
+    generations = get_generations((SiteSettings,) + tuple(models))
+    raw = f"{generations}:{variant}:{wants_fragment(request)}:{request.build_absolute_uri()}"
+    return f'{PAGE_CACHE_PREFIX}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def cache_public_page(*models):
+    """
+    Cache a GET view's rendered response for PUBLIC_PAGE_CACHE_TIMEOUT (anonymous) or
+    PUBLIC_PAGE_CACHE_AUTH_TIMEOUT (signed in; 0 disables). ``models`` are the models
+    the page displays. Requests carrying flash messages, error responses, responses
+    that set cookies and pages that minted a brand-new CSRF secret are never stored.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            authenticated = request.user.is_authenticated
+            timeout = settings.PUBLIC_PAGE_CACHE_AUTH_TIMEOUT if authenticated else settings.PUBLIC_PAGE_CACHE_TIMEOUT
+            if request.method not in ('GET', 'HEAD') or not timeout or has_pending_messages(request):
+                return view_func(request, *args, **kwargs)
+
+            key = page_cache_key(request, models)
+            cached = cache.get(key)
+            if cached is not None:
+                response, uses_csrf = cached
+                if uses_csrf:
+                    # Let CsrfViewMiddleware refresh the cookie the cached token belongs to.
+                    get_token(request)
+                return response
+
+            had_secret = 'CSRF_COOKIE' in request.META
+            response = view_func(request, *args, **kwargs)
+            if callable(getattr(response, 'render', None)):
+                response = response.render()
+            uses_csrf = bool(request.META.get('CSRF_COOKIE_NEEDS_UPDATE'))
+            patch_vary_headers(response, ('Cookie',))
+            if authenticated:
+                patch_cache_control(response, private=True)
+            if (
+                request.method == 'GET'
+                and response.status_code == 200
+                and not response.streaming
+                and not response.cookies
+                and not (uses_csrf and not (authenticated and had_secret))
+            ):
+                cache.set(key, (response, uses_csrf), timeout)
+            return response
+        return _wrapped_view
+    return decorator
@@ -1,5 +1,4 @@
-from .models import SiteSettings
+from .caching import get_site_settings
 
 def site_settings(request):
-    settings = SiteSettings.objects.first()
-    return {'site_settings': settings}
+    return {'site_settings': get_site_settings()}
@@ -0,0 +1,99 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+class CoalescingCounter:
+    """
+    In-memory increments for an integer column, written back as
+    ``UPDATE ... SET field = field + n`` once enough hits or time have accumulated.
+
+    Rows are never re-saved, so concurrent hits can't overwrite each other and the rest
+    of the row is left alone. Readers add ``pending(pk)`` to the stored value.
+    """
+
+    def __init__(self, model, field, flush_interval=10.0, flush_threshold=100):
+        self.model = model
+        self.field = field
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._pending = Counter()
+        self._total = 0
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def increment(self, pk, amount=1):
+        """
+        Count a hit and return the hits for ``pk`` not yet written, taken before any flush
+        this triggers: add it to a value read before the call.
+        """
+        with self._lock:
+            self._pending[pk] += amount
+            self._total += amount
+            unflushed = self._pending[pk]
+            due = self._total >= self.flush_threshold or time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            try:
+                self.flush()
+            except Exception:
+                # The deltas are kept for the next flush; a busy database mustn't fail the page.
+                logger.exception("Flushing %s.%s counters failed", self.model._meta.label, self.field)
+        return unflushed
+
+    def pending(self, pk):
+        return self._pending.get(pk, 0)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._total = 0
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+        # One UPDATE per distinct delta: most rows in a window share small deltas.
+        by_delta = defaultdict(list)
+        for pk, amount in pending.items():
+            by_delta[amount].append(pk)
+        try:
+            with transaction.atomic():
+                for amount, pks in by_delta.items():
+                    self.model._default_manager.filter(pk__in=pks).update(**{self.field: F(self.field) + amount})
+        except Exception:
+            # Put the deltas back so the next flush retries them.
+            with self._lock:
+                self._pending.update(pending)
+                self._total += sum(pending.values())
+            raise
+        return len(pending)
+
+
+_counters = {}
+_counters_lock = threading.Lock()
+
+
+def get_counter(model, field):
+    key = (model, field)
+    if key not in _counters:
+        with _counters_lock:
+            if key not in _counters:
+                counter = CoalescingCounter(
+                    model, field,
+                    flush_interval=settings.VIEW_COUNTER_FLUSH_INTERVAL,
+                    flush_threshold=settings.VIEW_COUNTER_FLUSH_THRESHOLD,
+                )
+                atexit.register(counter.flush)
+                _counters[key] = counter
+    return _counters[key]
+
+
+def flush_all():
+    for counter in list(_counters.values()):
+        counter.flush()
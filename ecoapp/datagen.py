@@ -0,0 +1,268 @@
+import datetime
+import itertools
+import json
+import random
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core import serializers
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .caching import bump_generation, search_cache
+from .models import Category, EcoAction, Event, LoginActivity, SearchLog, Upload, VisitTracker
+from .rollups import rebuild_rollups
+from .search import SEARCH_FIELDS, get_search_backend
+
+User = get_user_model()
+
+DEFAULT_CATEGORIES = [
+    'Recycling', 'Energy Saving', 'Sustainable Transport', 'Water Conservation',
+    'Composting', 'Tree Planting', 'Clean-up Drives', 'Plastic Free',
+]
+VERBS = ['Start', 'Join', 'Organise', 'Switch to', 'Reduce', 'Plan', 'Support', 'Try', 'Host', 'Build']
+NOUNS = [
+    'a compost bin', 'LED bulbs', 'a beach clean-up', 'cycling to work', 'rainwater harvesting',
+    'a community garden', 'reusable bags', 'a repair cafe', 'solar panels', 'a tree planting day',
+    'meatless Mondays', 'a clothes swap', 'a river clean-up', 'car pooling', 'a zero-waste pantry',
+]
+PLACES = ['Riverside Park', 'Central Library', 'Town Hall', 'Community Centre', 'Beachfront', 'Old Mill']
+CITIES = ['Windsor', 'London', 'Toronto', 'Ottawa', 'Hamilton', 'Kingston', 'Guelph', 'Waterloo']
+SENTENCES = [
+    'Bring gloves and a reusable bottle.',
+    'Everyone is welcome, no experience needed.',
+    'We will share tips on cutting household waste.',
+    'Materials are provided by local sponsors.',
+    'Saves energy and money over the year.',
+    'A small change that adds up across the neighbourhood.',
+]
+SEARCH_TERMS = ['compost', 'recycle', 'solar', 'bike', 'clean up', 'tree', 'water', 'plastic', 'garden', 'energy', 'led']
+
+
+@contextmanager
+def raw_timestamps(*models):
+    """Let bulk_create keep given auto_now/auto_now_add values (generated or fixture data)."""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def bulk_insert(model, objects, batch_size=5000, transaction_size=100000):
+    """
+    Insert an iterable of unsaved instances with bulk_create, ``batch_size`` rows per
+    INSERT and one transaction per ``transaction_size`` rows. Returns the new pks.
+    """
+    pks = []
+    objects = iter(objects)
+    while True:
+        with transaction.atomic():
+            inserted = 0
+            while inserted < transaction_size:
+                batch = list(itertools.islice(objects, batch_size))
+                if not batch:
+                    return pks
+                with raw_timestamps(model):
+                    created = model._default_manager.bulk_create(batch, batch_size=batch_size)
+                pks.extend(obj.pk for obj in created)
+                inserted += len(batch)
+
+
+def generate_data(users=1000, actions=10000, events=5000, uploads=5000, logins=50000, searches=100000,
+                  days=730, seed=0, prefix='load', batch_size=5000, now=None, log=None):
+    """
+    Insert synthetic rows. The same ``seed`` always produces the same data, with
+    timestamps counted back from ``now`` (midnight today by default). Usernames are
+    ``{prefix}-{seed}-{n}`` so different seeds can be loaded side by side.
+    """
+    rng = random.Random(seed)
+    now = now or timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    log = log or (lambda message: None)
+    counts = {}
+
+    def moment():
+        return now - datetime.timedelta(seconds=rng.randrange(days * 86400))
+
+    def text(n=2):
+        return ' '.join(rng.choice(SENTENCES) for _ in range(n))
+
+    category_ids = list(Category.objects.values_list('pk', flat=True))
+    if not category_ids:
+        category_ids = bulk_insert(Category, (Category(name=name) for name in DEFAULT_CATEGORIES))
+
+    # Hashing is deliberately slow; every generated user shares one precomputed hash.
+    password = make_password('greenworld')
+    user_ids = bulk_insert(User, (
+        User(username=f'{prefix}-{seed}-{i}', email=f'{prefix}-{seed}-{i}@example.com', password=password,
+             date_joined=moment())
+        for i in range(users)
+    ), batch_size)
+    counts['users'] = len(user_ids)
+    log(f"users: {len(user_ids)}")
+    if not user_ids:
+        return counts
+
+    def timestamps():
+        created = moment()
+        return {'created_at': created, 'updated_at': created}
+
+    counts['eco actions'] = len(bulk_insert(EcoAction, (
+        EcoAction(title=f'{rng.choice(VERBS)} {rng.choice(NOUNS)}', description=text(), category_id=rng.choice(category_ids),
+                  user_id=rng.choice(user_ids), **timestamps())
+        for _ in range(actions)
+    ), batch_size))
+    log(f"eco actions: {counts['eco actions']}")
+
+    def event(i):
+        created = moment()
+        return Event(
+            title=f'{rng.choice(VERBS)} {rng.choice(NOUNS)}', description=text(3), category_id=rng.choice(category_ids),
+            user_id=rng.choice(user_ids), date=(created + datetime.timedelta(days=rng.randrange(60))).date(),
+            time=datetime.time(rng.randrange(8, 20), rng.choice((0, 30))), location=rng.choice(PLACES),
+            city=rng.choice(CITIES), views=rng.randrange(500), created_at=created, updated_at=created,
+        )
+    counts['events'] = len(bulk_insert(Event, (event(i) for i in range(events)), batch_size))
+    log(f"events: {counts['events']}")
+
+    def upload(i):
+        created = moment()
+        return Upload(
+            title=f'{rng.choice(NOUNS).capitalize()} guide {i}', description=text(), category_id=rng.choice(category_ids),
+            user_id=rng.choice(user_ids), file=f'uploads/generated/{i}.pdf', uploaded_at=created, updated_at=created,
+        )
+    counts['uploads'] = len(bulk_insert(Upload, (upload(i) for i in range(uploads)), batch_size))
+    log(f"uploads: {counts['uploads']}")
+
+    # Round-robin over users, one day further back each lap: (user, date) stays unique.
+    today = now.date()
+    counts['login activity'] = len(bulk_insert(LoginActivity, (
+        LoginActivity(user_id=user_ids[i % len(user_ids)], login_date=today - datetime.timedelta(days=i // len(user_ids)))
+        for i in range(logins)
+    ), batch_size))
+    log(f"login activity: {counts['login activity']}")
+
+    def search_log(i):
+        query = rng.choice(SEARCH_TERMS)
+        if rng.random() < 0.3:
+            query = f'{query} {rng.choice(CITIES).lower()}'
+        return SearchLog(query=query, user_id=rng.choice(user_ids) if rng.random() < 0.6 else None, searched_at=moment())
+    counts['search logs'] = len(bulk_insert(SearchLog, (search_log(i) for i in range(searches)), batch_size))
+    log(f"search logs: {counts['search logs']}")
+    return counts
+
+
+def rebuild_derived(models=None):
+    """
+    bulk_create sends no post_save signals; rebuild what they would have maintained,
+    for all models or only those in ``models``.
+    """
+    backend = get_search_backend()
+    if models is None:
+        models = [Category, LoginActivity, VisitTracker, *SEARCH_FIELDS]
+    for model in SEARCH_FIELDS:
+        if model in models:
+            backend.rebuild(model)
+    if {LoginActivity, VisitTracker} & set(models):
+        rebuild_rollups()
+    # Nor do the caches the signals invalidate notice the new rows.
+    search_cache.clear()
+    for model in models:
+        bump_generation(model)
+
+
+def iter_json_array(stream, chunk_size=65536):
+    """Yield the elements of a top-level JSON array one at a time, reading ``stream`` in chunks."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+    while True:
+        # Skip whitespace and separators between elements.
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer) or eof:
+                break
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+        if position >= len(buffer):
+            raise ValueError("Unexpected end of fixture")
+        if not started:
+            if buffer[position] != '[':
+                raise ValueError("Fixture must be a JSON array")
+            started = True
+            position += 1
+            continue
+        if buffer[position] == ']':
+            return
+        try:
+            element, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield element
+        position = end
+
+
+def load_fixture(stream, batch_size=5000):
+    """
+    Stream a JSON fixture into the database with batched bulk_create, so memory use is
+    bounded by ``batch_size`` rows rather than the file size. Timestamps are kept as
+    written; many-to-many data and natural keys are not supported. The search index and
+    rollups of the loaded models are rebuilt afterwards.
+    """
+    counts = {}
+    pending = {}
+    now = timezone.now()
+
+    def flush(model):
+        objects = pending.pop(model, [])
+        if objects:
+            # Fixtures written before a timestamp field existed leave it empty.
+            for field in model._meta.concrete_fields:
+                if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                    for obj in objects:
+                        if getattr(obj, field.attname) is None:
+                            setattr(obj, field.attname, now)
+            with raw_timestamps(model):
+                model._default_manager.bulk_create(objects, batch_size=batch_size)
+            counts[model] = counts.get(model, 0) + len(objects)
+
+    with transaction.atomic():
+        for element in iter_json_array(stream):
+            if element.get('fields', {}) and any(isinstance(v, list) for v in element['fields'].values()):
+                raise ValueError(f"Many-to-many data is not supported ({element.get('model')})")
+            deserialized = next(serializers.deserialize('python', [element]))
+            model = type(deserialized.object)
+            if pending and model not in pending:
+                # Keep insertion order across models so foreign keys resolve.
+                for other in list(pending):
+                    flush(other)
+            pending.setdefault(model, []).append(deserialized.object)
+            if len(pending[model]) >= batch_size:
+                flush(model)
+        for model in list(pending):
+            flush(model)
+        # Explicit pks leave PostgreSQL sequences behind; loaddata resets them the same way.
+        sequence_sql = connection.ops.sequence_reset_sql(no_style(), list(counts))
+        if sequence_sql:
+            with connection.cursor() as cursor:
+                for sql in sequence_sql:
+                    cursor.execute(sql)
+        rebuild_derived(counts)
+    return {model._meta.label: count for model, count in counts.items()}
@@ -107,6 +107,8 @@ class SearchForm(forms.Form):
         max_length=255,
         widget=forms.TextInput(attrs={
             'class': 'form-control',
-            'placeholder': 'Search by title or description'
+            'placeholder': 'Search by title or description',
+            'list': 'search-suggestions',
+            'autocomplete': 'off',
         })
     )
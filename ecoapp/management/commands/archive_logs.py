@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ecoapp.retention import ARCHIVED_LOGS, archive_log, cutoff_for
+
+
+class Command(BaseCommand):
+    help = "Move old VisitTracker, SearchLog and LoginActivity rows into monthly gzip JSONL archives."
+
+    def add_arguments(self, parser):
+        parser.add_argument('logs', nargs='*', help=f"Logs to archive ({', '.join(ARCHIVED_LOGS)}); default all.")
+        parser.add_argument('--days', type=int, help="Archive rows older than this (default RETENTION_DAYS per log).")
+        parser.add_argument('--chunk-size', type=int, help="Rows per chunk (default ARCHIVE_CHUNK_SIZE).")
+        parser.add_argument('--pause', type=float, help="Seconds between chunks (default ARCHIVE_PAUSE).")
+        parser.add_argument('--dry-run', action='store_true', help="Only count what would be archived.")
+
+    def handle(self, *args, **options):
+        logs = options['logs'] or list(ARCHIVED_LOGS)
+        unknown = set(logs) - set(ARCHIVED_LOGS)
+        if unknown:
+            raise CommandError(f"Unknown logs: {', '.join(sorted(unknown))}")
+        pause = settings.ARCHIVE_PAUSE if options['pause'] is None else options['pause']
+        for name in logs:
+            days = options['days'] if options['days'] is not None else settings.RETENTION_DAYS[name]
+            before = cutoff_for(name, days)
+            archived = archive_log(name, before, chunk_size=options['chunk_size'], pause=pause, dry_run=options['dry_run'])
+            verb = "Would archive" if options['dry_run'] else "Archived"
+            self.stdout.write(self.style.SUCCESS(f"{verb} {sum(archived.values())} {name} rows older than {before:%Y-%m-%d}."))
+            for month, rows in sorted(archived.items()):
+                self.stdout.write(f"    {month:%Y-%m}: {rows}")
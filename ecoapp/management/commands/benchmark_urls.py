@@ -0,0 +1,76 @@
+import json
+import logging
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from ecoapp.benchmark import BENCHMARK_USERNAME, SCALES, compare, load_baseline, run_benchmarks, seed_scale
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a separate benchmark database and measure p50/p95 latency, query count and peak "
+        "memory for every named ecoapp route; optionally fail on regressions against a baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--route', action='append', dest='routes', help="Only benchmark this route name (repeatable).")
+        parser.add_argument('--keepdb', action='store_true', help="Reuse the seeded benchmark database between runs.")
+        parser.add_argument('--no-page-cache', action='store_true', help="Disable the public page cache while measuring.")
+        parser.add_argument('--output', help="Write results as JSON to this file.")
+        parser.add_argument('--baseline', help="JSON results of an earlier run to compare against.")
+        parser.add_argument('--threshold', type=float, default=1.25,
+                            help="Allowed p95/memory ratio over the baseline before failing.")
+
+    def handle(self, *args, **options):
+        scale = options['scale']
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        if connection.vendor == 'sqlite':
+            # A file, not the in-memory default, so --keepdb can reuse the seeded rows.
+            test_settings['NAME'] = os.path.join(tempfile.gettempdir(), f'greenworld-benchmark-{scale}.sqlite3')
+        else:
+            test_settings['NAME'] = f"{connection.settings_dict['NAME']}_benchmark_{scale}"
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            if not get_user_model().objects.filter(username=BENCHMARK_USERNAME).exists():
+                self.stdout.write(f"Seeding the {scale} dataset...")
+                seed_scale(scale, log=lambda message: self.stdout.write(f"  {message}"))
+            overrides = {'PUBLIC_PAGE_CACHE_TIMEOUT': 0, 'PUBLIC_PAGE_CACHE_AUTH_TIMEOUT': 0} if options['no_page_cache'] else {}
+            # Expected 4xx responses (GET /logout/ and the like) would log on every iteration.
+            request_logger = logging.getLogger('django.request')
+            level = request_logger.level
+            request_logger.setLevel(logging.ERROR)
+            try:
+                with override_settings(**overrides):
+                    results = run_benchmarks(options['iterations'], options['warmup'], options['routes'], log=self.stdout.write)
+            finally:
+                request_logger.setLevel(level)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        report = {
+            'scale': scale,
+            'iterations': options['iterations'],
+            'created': timezone.now().isoformat(),
+            'routes': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+        if options['baseline']:
+            regressions = compare(results, load_baseline(options['baseline']), options['threshold'])
+            if regressions:
+                raise CommandError("Performance regressions:\n  " + "\n  ".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
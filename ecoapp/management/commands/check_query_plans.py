@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ecoapp.queryplans import check_query_plans, seed_tables
+
+
+class Command(BaseCommand):
+    help = "Seed large tables inside a rolled-back transaction and check that every hot query uses an index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help="Rows to insert per table.")
+        parser.add_argument('--users', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user_ids = seed_tables(options['rows'], options['users'])
+            results = check_query_plans(user_ids[0])
+            transaction.set_rollback(True)
+
+        failures = []
+        for name, (plan, problems) in results.items():
+            style = self.style.ERROR if problems else self.style.SUCCESS
+            self.stdout.write(style(f"{name}: {'FAIL' if problems else 'ok'}"))
+            for line in plan.splitlines():
+                self.stdout.write(f"    {line}")
+            if problems:
+                failures.append(name)
+        if failures:
+            raise CommandError(f"Queries not served by an index: {', '.join(failures)}")
@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ecoapp.autocomplete import compact_search_log
+
+
+class Command(BaseCommand):
+    help = "Fold old SearchLog rows into per-query counts (SearchQueryCount) and delete them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help="Compact rows older than this many days.")
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['days'])
+        compacted = compact_search_log(before, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Compacted {compacted} search log rows."))
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ecoapp.datagen import generate_data, rebuild_derived
+
+
+class Command(BaseCommand):
+    help = "Insert deterministic synthetic users, actions, events, uploads, logins and searches for load testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--actions', type=int, default=10000)
+        parser.add_argument('--events', type=int, default=5000)
+        parser.add_argument('--uploads', type=int, default=5000)
+        parser.add_argument('--logins', type=int, default=50000)
+        parser.add_argument('--searches', type=int, default=100000)
+        parser.add_argument('--days', type=int, default=730, help="Spread timestamps over this many past days.")
+        parser.add_argument('--seed', type=int, default=0, help="Same seed, same data.")
+        parser.add_argument('--prefix', default='load', help="Username prefix for generated users.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--skip-derived', action='store_true', help="Don't rebuild the search index and rollups afterwards.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        counts = generate_data(
+            users=options['users'], actions=options['actions'], events=options['events'],
+            uploads=options['uploads'], logins=options['logins'], searches=options['searches'],
+            days=options['days'], seed=options['seed'], prefix=options['prefix'],
+            batch_size=options['batch_size'], log=self.stdout.write,
+        )
+        if not options['skip_derived']:
+            rebuild_derived()
+            self.stdout.write("Rebuilt the search index and activity rollups.")
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(f"Inserted {total} rows in {time.monotonic() - started:.1f}s."))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from ecoapp.models import Upload, Event, TeamMember
+from ecoapp.renditions import generate_renditions, is_image
+
+IMAGE_FIELDS = (
+    (Upload, 'file'),
+    (Event, 'image'),
+    (TeamMember, 'photo'),
+)
+
+
+class Command(BaseCommand):
+    help = "Generate missing image renditions for existing uploads, event images and team photos."
+
+    def handle(self, *args, **options):
+        created = 0
+        for model, field in IMAGE_FIELDS:
+            names = model._default_manager.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+            for name in names.values_list(field, flat=True).distinct().iterator():
+                if is_image(name):
+                    created += len(generate_renditions(name))
+        self.stdout.write(self.style.SUCCESS(f"Created {created} renditions."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ecoapp.datagen import load_fixture
+
+
+class Command(BaseCommand):
+    help = "Load large JSON fixtures with batched inserts, reading them as a stream instead of all at once."
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixtures', nargs='+', help="Paths to JSON fixture files (a top-level array).")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        for path in options['fixtures']:
+            try:
+                with open(path, encoding='utf-8') as stream:
+                    counts = load_fixture(stream, batch_size=options['batch_size'])
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"{path}: {exc}")
+            for label, count in counts.items():
+                self.stdout.write(f"{path}: {count} {label}")
+        self.stdout.write(self.style.SUCCESS("Fixtures loaded."))
@@ -0,0 +1,35 @@
+import datetime
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from ecoapp.retention import ARCHIVED_LOGS, archived_months, read_archive
+
+
+class Command(BaseCommand):
+    help = "Print archived log rows (see archive_logs) as JSON lines, or list the archived months."
+
+    def add_arguments(self, parser):
+        parser.add_argument('log', choices=sorted(ARCHIVED_LOGS))
+        parser.add_argument('--since', type=datetime.date.fromisoformat, help="YYYY-MM-DD, inclusive.")
+        parser.add_argument('--until', type=datetime.date.fromisoformat, help="YYYY-MM-DD, exclusive.")
+        parser.add_argument('--user', type=int, help="Only rows of this user id.")
+        parser.add_argument('--count', action='store_true', help="Print the number of matching rows only.")
+        parser.add_argument('--months', action='store_true', help="List the archived months.")
+
+    def handle(self, *args, **options):
+        if options['months']:
+            for month in archived_months(options['log']):
+                self.stdout.write(f"{month:%Y-%m}")
+            return
+        filters = {'user_id': options['user']} if options['user'] is not None else {}
+        try:
+            rows = read_archive(options['log'], start=options['since'], end=options['until'], **filters)
+            if options['count']:
+                self.stdout.write(str(sum(1 for _ in rows)))
+                return
+            for row in rows:
+                self.stdout.write(json.dumps(row, cls=DjangoJSONEncoder))
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read the archive: {e}")
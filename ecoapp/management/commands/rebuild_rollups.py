@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ecoapp.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute daily/weekly/monthly activity rollups from LoginActivity and VisitTracker."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--live-only', action='store_true', help="Ignore rows moved to the archive by archive_logs.")
+
+    def handle(self, *args, **options):
+        count = rebuild_rollups(include_archived=not options['live_only'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} rollup rows."))
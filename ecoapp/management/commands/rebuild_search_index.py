@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ecoapp.search import SEARCH_FIELDS, get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for EcoAction, Upload and Event."
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        for model in SEARCH_FIELDS:
+            count = backend.rebuild(model)
+            self.stdout.write(f"Indexed {count} {model._meta.verbose_name_plural}")
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
@@ -0,0 +1,51 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from ecoapp.taskqueue import Worker
+
+
+def work(options, log=None):
+    worker = Worker(batch_size=options['batch_size'], poll_interval=options['poll_interval'], names=options['task'])
+
+    def stop(signum, frame):
+        # Finish the batch in hand, then exit.
+        worker.stopping = True
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    worker.run(burst=options['burst'], log=log)
+
+
+class Command(BaseCommand):
+    help = "Run queued tasks (ecoapp.taskqueue) until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help="Worker processes to start.")
+        parser.add_argument('--batch-size', type=int, help="Tasks claimed at once (default TASK_BATCH_SIZE).")
+        parser.add_argument('--poll-interval', type=float, help="Idle wait in seconds (default TASK_POLL_INTERVAL).")
+        parser.add_argument('--task', action='append', help="Only run tasks with this name (repeatable).")
+        parser.add_argument('--burst', action='store_true', help="Exit once no task is due.")
+
+    def handle(self, *args, **options):
+        log = self.stdout.write if options['verbosity'] > 1 else None
+        if options['processes'] <= 1:
+            work(options, log)
+            return
+        # Children must not share the parent's database connections.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=work, args=(options, log), daemon=False) for _ in range(options['processes'])]
+        for process in processes:
+            process.start()
+        # Ignore Ctrl-C here: the children receive it too and stop after their batch.
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+        def stop_children(signum, frame):
+            for process in processes:
+                process.terminate()
+        signal.signal(signal.SIGTERM, stop_children)
+        for process in processes:
+            process.join()
+        self.stdout.write(f"{len(processes)} workers stopped.")
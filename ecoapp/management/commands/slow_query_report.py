@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from ecoapp.models import SlowQuery
+
+ORDERINGS = {
+    'time': '-total_time',
+    'max': '-max_time',
+    'count': '-executions',
+    'repeat': '-max_per_request',
+}
+
+
+class Command(BaseCommand):
+    help = "List the slowest and most frequent query shapes recorded by the slow-query log."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sort', choices=sorted(ORDERINGS), default='time',
+                            help="total time, max single time, executions, or most runs in one request.")
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--view', help="Only shapes from this view name, e.g. ecoapp:search.")
+        parser.add_argument('--explain', action='store_true', help="Print the captured plans.")
+        parser.add_argument('--reset', action='store_true', help="Delete the recorded shapes afterwards.")
+
+    def handle(self, *args, **options):
+        shapes = SlowQuery.objects.order_by(ORDERINGS[options['sort']], 'pk')
+        if options['view']:
+            shapes = shapes.filter(view_name=options['view'])
+        for shape in shapes[:options['limit']]:
+            average = shape.total_time / shape.executions * 1000 if shape.executions else 0
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{shape.view_name}  {shape.executions} runs ({shape.slow_executions} slow) in {shape.requests} requests, "
+                f"total {shape.total_time * 1000:.1f} ms, avg {average:.2f} ms, max {shape.max_time * 1000:.1f} ms, "
+                f"up to {shape.max_per_request} per request"
+            ))
+            self.stdout.write(f"    {shape.sql}")
+            if options['explain'] and shape.explain:
+                for line in shape.explain.splitlines():
+                    self.stdout.write(f"      {line}")
+        if options['reset']:
+            deleted, _ = shapes.delete()
+            self.stdout.write(f"Deleted {deleted} shapes.")
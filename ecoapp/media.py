@@ -0,0 +1,139 @@
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+COMPRESSED_TYPES = {
+    'bzip2': 'application/x-bzip',
+    'gzip': 'application/gzip',
+    'xz': 'application/x-xz',
+    'br': 'application/x-brotli',
+    'compress': 'application/x-compress',
+}
+
+# Paths whose bytes never change for a given name (content-addressed blobs and their renditions).
+IMMUTABLE_PREFIXES = ('uploads/blobs/',)
+
+
+def cache_control_for(path):
+    if path.startswith(IMMUTABLE_PREFIXES):
+        return 'public, max-age=31536000, immutable'
+    return f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+
+
+def parse_range(header, size):
+    """
+    Return ``(start, end)`` (inclusive) for a single byte range, None when the header
+    should be ignored (absent, invalid or multi-range), or ``False`` when it can't be
+    satisfied.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        # Syntactically invalid (RFC 9110 14.1.1): ignore it and send the whole file.
+        return None
+    if start >= size:
+        return False
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+def iter_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve a file from MEDIA_ROOT with validators (ETag/Last-Modified, answering 304s),
+    single byte-range requests, and optional hand-off to the front-end server through
+    MEDIA_ACCEL_REDIRECT_PREFIX (nginx) or MEDIA_SENDFILE_HEADER (Apache/lighttpd).
+    """
+    return serve_file(request, path, settings.MEDIA_ROOT, offload=True)
+
+
+@require_safe
+def serve_static(request, path):
+    """Serve collected static files from STATIC_ROOT, for deployments without a front-end server."""
+    return serve_file(request, path, settings.STATIC_ROOT, offload=False)
+
+
+def serve_file(request, path, document_root, offload):
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(document_root, path)
+        stat = os.stat(full_path)
+    except (ValueError, OSError):
+        raise Http404("File not found.")
+    if not os.path.isfile(full_path):
+        raise Http404("File not found.")
+
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        not_modified['Cache-Control'] = cache_control_for(path)
+        return not_modified
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    # Serve compressed files as-is rather than as Content-Encoding.
+    content_type = COMPRESSED_TYPES.get(encoding, content_type) or 'application/octet-stream'
+
+    if offload and (settings.MEDIA_ACCEL_REDIRECT_PREFIX or settings.MEDIA_SENDFILE_HEADER):
+        # The front-end server streams the file (and handles ranges) itself. Both headers
+        # are percent-encoded, as file names may hold spaces or non-ASCII characters.
+        response = HttpResponse(content_type=content_type)
+        if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+            response['X-Accel-Redirect'] = quote(settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + path)
+        else:
+            response[settings.MEDIA_SENDFILE_HEADER] = quote(full_path)
+    else:
+        byte_range = None
+        if_range = request.headers.get('If-Range')
+        if not if_range or if_range == etag or parse_http_date_safe(if_range) == last_modified:
+            byte_range = parse_range(request.headers.get('Range'), stat.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        if byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(iter_range(full_path, start, end - start + 1), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = str(end - start + 1)
+        else:
+            # FileResponse lets the WSGI server use wsgi.file_wrapper (sendfile).
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = cache_control_for(path)
+    return response
@@ -0,0 +1,218 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+from .querybudget import count_context_queries
+
+# Upper bounds of the histogram buckets (Prometheus "le"); +Inf is implied.
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 12, 20, 50, 100)
+BYTES_BUCKETS = (512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+
+HISTOGRAMS = {
+    'ecoapp_request_duration_seconds': ('Wall time per request.', SECONDS_BUCKETS),
+    'ecoapp_request_db_seconds': ('Time spent executing SQL per request.', SECONDS_BUCKETS),
+    'ecoapp_request_queries': ('SQL queries per request.', QUERY_BUCKETS),
+    'ecoapp_request_template_seconds': ('Template rendering time per request.', SECONDS_BUCKETS),
+    'ecoapp_response_size_bytes': ('Response body size (non-streaming responses).', BYTES_BUCKETS),
+}
+REQUESTS_TOTAL = 'ecoapp_requests_total'
+
+
+class MetricsRegistry:
+    """
+    In-process request histograms. Each thread writes to its own shard, so recording
+    takes no lock; only registering a new thread's shard and scraping do.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {'histograms': {}, 'requests': {}}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def observe(self, view, method, status, duration, db_time, queries, template_time, size=None):
+        shard = self._shard()
+        requests = shard['requests']
+        key = (view, method, str(status))
+        requests[key] = requests.get(key, 0) + 1
+        values = {
+            'ecoapp_request_duration_seconds': duration,
+            'ecoapp_request_db_seconds': db_time,
+            'ecoapp_request_queries': queries,
+            'ecoapp_request_template_seconds': template_time,
+            'ecoapp_response_size_bytes': size,
+        }
+        histograms = shard['histograms']
+        for name, value in values.items():
+            if value is None:
+                continue
+            buckets = HISTOGRAMS[name][1]
+            histogram = histograms.get((name, view))
+            if histogram is None:
+                # Per-bucket (not cumulative) counts, then sum and count.
+                histogram = histograms[(name, view)] = [[0] * (len(buckets) + 1), 0.0, 0]
+            histogram[0][bisect.bisect_left(buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def collect(self):
+        """Merge the shards: ``(histograms, requests)`` keyed like ``observe`` stores them."""
+        with self._lock:
+            shards = list(self._shards)
+        histograms = {}
+        requests = {}
+        for shard in shards:
+            for key, count in list(shard['requests'].items()):
+                requests[key] = requests.get(key, 0) + count
+            for key, (counts, total, count) in list(shard['histograms'].items()):
+                merged = histograms.setdefault(key, [[0] * len(counts), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+                merged[2] += count
+        return histograms, requests
+
+    def reset(self):
+        with self._lock:
+            for shard in self._shards:
+                shard['histograms'].clear()
+                shard['requests'].clear()
+
+
+registry = MetricsRegistry()
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_number(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+def render_prometheus(registry=registry):
+    """The registry in the Prometheus text exposition format (version 0.0.4)."""
+    histograms, requests = registry.collect()
+    lines = [
+        f'# HELP {REQUESTS_TOTAL} Requests by view, method and status.',
+        f'# TYPE {REQUESTS_TOTAL} counter',
+    ]
+    for (view, method, status), count in sorted(requests.items()):
+        lines.append(f'{REQUESTS_TOTAL}{{view="{escape_label(view)}",method="{method}",status="{status}"}} {count}')
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for (metric, view), (counts, total, count) in sorted(histograms.items()):
+            if metric != name:
+                continue
+            label = f'view="{escape_label(view)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(list(buckets) + ['+Inf'], counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{label}}} {format_number(total)}')
+            lines.append(f'{name}_count{{{label}}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+# Template time of the current request; None outside instrumented requests.
+_template_time = ContextVar('template_time', default=None)
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        timer = _template_time.get()
+        if timer is None or timer['depth']:
+            # Not in a request, or nested inside a render that's already being timed.
+            return super().render(context, request)
+        timer['depth'] += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timer['depth'] -= 1
+            timer['seconds'] += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates backend whose templates report their render time to MetricsMiddleware."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None and match.view_name else 'unresolved'
+
+
+def response_size(response):
+    if response.streaming:
+        return None
+    return len(response.content)
+
+
+class MetricsMiddleware:
+    """Record wall, SQL and template time, query count and body size per resolved view."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = settings.METRICS_ENABLED
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        timer = {'seconds': 0.0, 'depth': 0}
+        token = _template_time.set(timer)
+        started = time.perf_counter()
+        try:
+            with count_context_queries() as queries:
+                response = self.get_response(request)
+        finally:
+            _template_time.reset(token)
+        self.record(request, response, time.perf_counter() - started, queries, timer)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        timer = {'seconds': 0.0, 'depth': 0}
+        token = _template_time.set(timer)
+        started = time.perf_counter()
+        try:
+            with count_context_queries() as queries:
+                response = await self.get_response(request)
+        finally:
+            _template_time.reset(token)
+        self.record(request, response, time.perf_counter() - started, queries, timer)
+        return response
+
+    def record(self, request, response, duration, queries, timer):
+        registry.observe(
+            view_label(request), request.method, response.status_code, duration,
+            queries.duration, queries.count, timer['seconds'], response_size(response),
+        )
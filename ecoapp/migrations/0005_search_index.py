@@ -0,0 +1,38 @@
+from django.db import migrations
+
+# FTS5 tables backing ecoapp.search.SQLiteFTSBackend (rowid = model pk).
+FTS_TABLES = {
+    'ecoaction': "SELECT id, title, description, NULL FROM ecoapp_ecoaction",
+    'upload': "SELECT id, title, description, user_id FROM ecoapp_upload",
+    'event': "SELECT id, title, description || ' ' || location || ' ' || city, NULL FROM ecoapp_event",
+}
+
+
+def create_fts_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name, select in FTS_TABLES.items():
+        table = f'ecoapp_fts_{name}'
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+            f"title, body, owner_id UNINDEXED, tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(f"INSERT INTO {table} (rowid, title, body, owner_id) {select}")
+
+
+def drop_fts_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in FTS_TABLES:
+        schema_editor.execute(f"DROP TABLE IF EXISTS ecoapp_fts_{name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecoapp', '0004_event'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_tables, drop_fts_tables),
+    ]
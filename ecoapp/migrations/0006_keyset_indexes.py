@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecoapp', '0005_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ecoaction',
+            index=models.Index(fields=['-created_at', 'id'], name='ecoaction_created_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['-date', 'id'], name='event_date_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='upload',
+            index=models.Index(fields=['user', '-uploaded_at', 'id'], name='upload_user_keyset'),
+        ),
+    ]
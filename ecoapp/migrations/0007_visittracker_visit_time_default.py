@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:41
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecoapp', '0006_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='visittracker',
+            name='visit_time',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
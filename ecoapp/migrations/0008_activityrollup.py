@@ -0,0 +1,79 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:42
+
+import datetime
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    # A frozen copy of ecoapp.rollups.rebuild_rollups as it stood here, so later changes
+    # to that module don't change what this migration does.
+    ActivityRollup = apps.get_model('ecoapp', 'ActivityRollup')
+    LoginActivity = apps.get_model('ecoapp', 'LoginActivity')
+    VisitTracker = apps.get_model('ecoapp', 'VisitTracker')
+
+    deltas = defaultdict(lambda: [0, 0])
+
+    def add_activity(user_id, day, login_days=0, visits=0):
+        starts = {
+            'day': day,
+            'week': day - datetime.timedelta(days=day.weekday()),
+            'month': day.replace(day=1),
+        }
+        for period, start in starts.items():
+            for scope in (user_id, None):
+                counts = deltas[(scope, period, start)]
+                counts[0] += login_days
+                counts[1] += visits
+
+    for user_id, day in LoginActivity.objects.values_list('user_id', 'login_date').iterator():
+        add_activity(user_id, day, login_days=1)
+    daily_visits = (
+        VisitTracker.objects.filter(user__isnull=False)
+        .annotate(day=TruncDate('visit_time'))
+        .values_list('user_id', 'day')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    for user_id, day, total in daily_visits.iterator():
+        add_activity(user_id, day, visits=total)
+
+    ActivityRollup.objects.all().delete()
+    ActivityRollup.objects.bulk_create(
+        [
+            ActivityRollup(user_id=user_id, period=period, period_start=start, login_days=login_days, visits=visits)
+            for (user_id, period, start), (login_days, visits) in deltas.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecoapp', '0007_visittracker_visit_time_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('login_days', models.PositiveIntegerField(default=0)),
+                ('visits', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('user', 'period', 'period_start'), name='rollup_unique_user_period'), models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('period', 'period_start'), name='rollup_unique_site_period')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
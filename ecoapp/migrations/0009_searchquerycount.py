@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecoapp', '0008_activityrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchQueryCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(max_length=255, unique=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('last_searched', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:48
+
+import ecoapp.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecoapp', '0009_searchquerycount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='sha256',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='upload',
+            name='file',
+            field=models.FileField(storage=ecoapp.storage.blob_storage, upload_to=ecoapp.storage.blob_upload_to),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecoapp', '0011_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='searchlog',
+            index=models.Index(fields=['searched_at'], name='searchlog_searched_at'),
+        ),
+        migrations.AddIndex(
+            model_name='visittracker',
+            index=models.Index(fields=['user', '-visit_time'], name='visit_user_time'),
+        ),
+    ]
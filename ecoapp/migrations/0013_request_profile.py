@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecoapp', '0012_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('view_name', models.CharField(blank=True, max_length=200)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('mode', models.CharField(choices=[('cprofile', 'cProfile'), ('sample', 'Sampling')], max_length=10)),
+                ('duration', models.FloatField(help_text='Seconds')),
+                ('query_count', models.PositiveIntegerField(default=0)),
+                ('query_time', models.FloatField(default=0, help_text='Seconds')),
+                ('report', models.TextField(blank=True)),
+                ('queries', models.JSONField(blank=True, default=list)),
+                ('stats', models.BinaryField(blank=True, null=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
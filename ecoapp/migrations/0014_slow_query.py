@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecoapp', '0013_request_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=32)),
+                ('view_name', models.CharField(max_length=200)),
+                ('sql', models.TextField(help_text='Normalized statement')),
+                ('example', models.TextField(help_text='Slowest statement seen, before normalization')),
+                ('explain', models.TextField(blank=True)),
+                ('requests', models.PositiveIntegerField(default=0, help_text='Requests in which the shape was slow or repeated')),
+                ('executions', models.PositiveIntegerField(default=0)),
+                ('slow_executions', models.PositiveIntegerField(default=0)),
+                ('total_time', models.FloatField(default=0, help_text='Seconds')),
+                ('max_time', models.FloatField(default=0, help_text='Seconds')),
+                ('max_per_request', models.PositiveIntegerField(default=0)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+                ('last_seen', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('fingerprint', 'view_name'), name='slowquery_unique_shape')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecoapp', '0015_task_queue'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loginactivity',
+            index=models.Index(fields=['login_date'], name='loginactivity_date'),
+        ),
+        migrations.AddIndex(
+            model_name='visittracker',
+            index=models.Index(fields=['visit_time'], name='visit_time'),
+        ),
+    ]
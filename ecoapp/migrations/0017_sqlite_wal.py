@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+def enable_wal(apps, schema_editor):
+    # WAL is stored in the database file, so it is set once here rather than on every
+    # connection (which would rewrite the file on any manage.py call).
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode=WAL')
+
+
+def disable_wal(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode=DELETE')
+
+
+class Migration(migrations.Migration):
+    # The journal mode can't change inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('ecoapp', '0016_retention_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(enable_wal, disable_wal),
+    ]
@@ -1,7 +1,10 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from .storage import blob_storage, blob_upload_to
+
 # Person 1: UserProfile and UserHistory
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -32,6 +35,12 @@ class EcoAction(models.Model):
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', 'id'], name='ecoaction_created_keyset'),
+        ]
 
     def __str__(self):
         return self.title
@@ -41,8 +50,16 @@ class Upload(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True)
-    file = models.FileField(upload_to='uploads/')
+    # Stored content-addressed, so identical files share one blob
+    file = models.FileField(upload_to=blob_upload_to, storage=blob_storage)
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-uploaded_at', 'id'], name='upload_user_keyset'),
+        ]
 
     def __str__(self):
         return self.title
@@ -53,7 +70,15 @@ class VisitTracker(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     ip_address = models.GenericIPAddressField()
     user_agent = models.TextField(blank=True)
-    visit_time = models.DateTimeField(auto_now_add=True)
+    # Set by the visit buffer at request time, not at (batched) insert time.
+    visit_time = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-visit_time'], name='visit_user_time'),
+            # Retention: archive_logs walks old rows in time order
+            models.Index(fields=['visit_time'], name='visit_time'),
+        ]
 
     def __str__(self):
         return f"Visit by {self.user or 'Anonymous'} at {self.visit_time}"
@@ -97,9 +122,23 @@ class SearchLog(models.Model):
     searched_at = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['searched_at'], name='searchlog_searched_at'),
+        ]
+
     def __str__(self):
         return f"Search: {self.query}"
 
+# Compacted SearchLog counts per normalized query (see compact_searchlog)
+class SearchQueryCount(models.Model):
+    query = models.CharField(max_length=255, unique=True)
+    count = models.PositiveIntegerField(default=0)
+    last_searched = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.query} ({self.count})"
+
 class Feedback(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     comment = models.TextField()
@@ -114,11 +153,45 @@ class LoginActivity(models.Model):
 
     class Meta:
         unique_together = ('user', 'login_date')
+        indexes = [
+            # Retention: archive_logs walks old rows in date order
+            models.Index(fields=['login_date'], name='loginactivity_date'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.login_date}"
 
 
+# Pre-aggregated login/visit counts per user (user=None for site-wide), see ecoapp.rollups
+class ActivityRollup(models.Model):
+    PERIOD_CHOICES = [
+        ('day', 'Day'),
+        ('week', 'Week'),
+        ('month', 'Month'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    login_days = models.PositiveIntegerField(default=0)
+    visits = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'period', 'period_start'], condition=models.Q(user__isnull=False),
+                name='rollup_unique_user_period',
+            ),
+            models.UniqueConstraint(
+                fields=['period', 'period_start'], condition=models.Q(user__isnull=True),
+                name='rollup_unique_site_period',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user or 'Site'} - {self.period} of {self.period_start}"
+
+
 
 class Event(models.Model):
     title = models.CharField(max_length=200)
@@ -132,5 +205,98 @@ class Event(models.Model):
     image = models.ImageField(upload_to='event_images/', blank=True, null=True)
     views = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-date', 'id'], name='event_date_keyset'),
+        ]
+
     def __str__(self):
         return self.title
+
+
+# One request run under the on-demand profiler (see ecoapp.profiling)
+class RequestProfile(models.Model):
+    MODE_CHOICES = [
+        ('cprofile', 'cProfile'),
+        ('sample', 'Sampling'),
+    ]
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view_name = models.CharField(max_length=200, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES)
+    duration = models.FloatField(help_text="Seconds")
+    query_count = models.PositiveIntegerField(default=0)
+    query_time = models.FloatField(default=0, help_text="Seconds")
+    report = models.TextField(blank=True)
+    # [{"sql", "ms", "stack": ["file:line in func", ...]}, ...]; parameters are not kept
+    queries = models.JSONField(default=list, blank=True)
+    # marshalled pstats data (cProfile mode), loadable with pstats/snakeviz
+    stats = models.BinaryField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration * 1000:.0f} ms)"
+
+
+# Slow or repeated query shapes per view, aggregated by SQL fingerprint (see ecoapp.slowqueries)
+class SlowQuery(models.Model):
+    fingerprint = models.CharField(max_length=32)
+    view_name = models.CharField(max_length=200)
+    sql = models.TextField(help_text="Normalized statement")
+    example = models.TextField(help_text="Slowest statement seen, before normalization")
+    explain = models.TextField(blank=True)
+    requests = models.PositiveIntegerField(default=0, help_text="Requests in which the shape was slow or repeated")
+    executions = models.PositiveIntegerField(default=0)
+    slow_executions = models.PositiveIntegerField(default=0)
+    total_time = models.FloatField(default=0, help_text="Seconds")
+    max_time = models.FloatField(default=0, help_text="Seconds")
+    max_per_request = models.PositiveIntegerField(default=0)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fingerprint', 'view_name'], name='slowquery_unique_shape'),
+        ]
+
+    def __str__(self):
+        return f"{self.view_name}: {self.sql[:80]}"
+
+
+# Deferred work for `manage.py runworker` (see ecoapp.taskqueue). Finished tasks are deleted.
+class Task(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='task_status_run_at'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
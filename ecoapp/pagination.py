@@ -0,0 +1,86 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+DEFAULT_PAGE_SIZE = 20
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset, ordered by (-field, pk)."""
+
+    def __init__(self, object_list, next_cursor, cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(value, pk):
+    raw = json.dumps([value.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(field, cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, pk = json.loads(raw)
+        return field.to_python(value), int(pk)
+    except (ValueError, TypeError, ValidationError):
+        raise Http404("Invalid page cursor.")
+
+
+def keyset_queryset(queryset, field_name, cursor=None):
+    """``queryset`` ordered by (-field_name, pk) and, with a cursor, seeked past it."""
+    field = queryset.model._meta.get_field(field_name)
+    queryset = queryset.order_by(f'-{field_name}', 'pk')
+    if cursor:
+        value, pk = decode_cursor(field, cursor)
+        queryset = queryset.filter(Q(**{f'{field_name}__lt': value}) | Q(**{field_name: value, 'pk__gt': pk}))
+    return queryset
+
+
+def keyset_paginate(queryset, field_name, cursor=None, per_page=DEFAULT_PAGE_SIZE):
+    """
+    Seek past ``cursor`` instead of using OFFSET, so every page costs the same
+    index range scan. Requires an index on (-field_name, pk).
+    """
+    queryset = keyset_queryset(queryset, field_name, cursor)
+    # Fetch one extra row to know whether there is a next page without a COUNT(*).
+    rows = list(queryset[:per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, field_name), last.pk)
+    return KeysetPage(rows, next_cursor, cursor)
+
+
+def wants_fragment(request):
+    return request.GET.get('fragment') == '1' or request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
+
+class KeysetPaginationMixin:
+    """ListView mixin: keyset pages plus an HTML fragment mode for infinite scroll."""
+    keyset_field = None
+    paginate_by = DEFAULT_PAGE_SIZE
+    fragment_template_name = None
+
+    def paginate_queryset(self, queryset, page_size):
+        page = keyset_paginate(queryset, self.keyset_field, self.request.GET.get('cursor'), page_size)
+        return None, page, page.object_list, page.has_next()
+
+    def get_template_names(self):
+        if self.fragment_template_name and wants_fragment(self.request):
+            return [self.fragment_template_name]
+        return super().get_template_names()
@@ -0,0 +1,218 @@
+import cProfile
+import io
+import logging
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.http import QueryDict
+
+from .metrics import view_label
+from .models import RequestProfile
+from .querybudget import QueryCounter, count_context_queries
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'X-Profile-Token'
+TOKEN_SALT = 'ecoapp.profiling'
+MODES = ('cprofile', 'sample')
+
+# Frames from these files say nothing about where a query came from.
+IGNORED_FILES = (os.path.abspath(__file__), os.path.abspath(sys.modules[QueryCounter.__module__].__file__))
+
+
+def make_profile_token(user, mode='cprofile'):
+    """A token that lets requests carrying it be profiled on behalf of staff ``user``."""
+    if mode not in MODES:
+        raise ValueError(f"Unknown profiling mode {mode!r}")
+    return signing.dumps({'user': user.pk, 'mode': mode}, salt=TOKEN_SALT, compress=True)
+
+
+def read_profile_token(token):
+    """``(user, mode)`` for a valid, unexpired token of an active staff user, else None."""
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT, max_age=settings.PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    user = get_user_model()._default_manager.filter(pk=data.get('user'), is_staff=True, is_active=True).first()
+    if user is None or data.get('mode') not in MODES:
+        return None
+    return user, data['mode']
+
+
+def pop_profile_token(request):
+    """
+    Take the token off the request (header or query parameter). The parameter is removed
+    from the query string so the view, and the page cache key, see the ordinary URL.
+    """
+    token = request.headers.get(PROFILE_HEADER)
+    if PROFILE_PARAM in request.GET:
+        query = request.GET.copy()
+        token = token or query.pop(PROFILE_PARAM)[-1]
+        request.META['QUERY_STRING'] = query.urlencode()
+        request.GET = QueryDict(request.META['QUERY_STRING'])
+    return token
+
+
+def query_origin(limit=None):
+    """The innermost project frames of the current stack, outermost first."""
+    limit = limit or settings.PROFILE_STACK_DEPTH
+    root = str(settings.BASE_DIR) + os.sep
+    frames = []
+    for frame in traceback.extract_stack():
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(root) and 'site-packages' not in filename and filename not in IGNORED_FILES:
+            frames.append(f"{os.path.relpath(filename, root)}:{frame.lineno} in {frame.name}")
+    return frames[-limit:]
+
+
+class QueryLog(QueryCounter):
+    """QueryCounter that also keeps each statement, its time and where it was run from."""
+
+    def __init__(self):
+        super().__init__()
+        self.queries = []
+
+    def record(self, sql, duration, params=None, connection=None):
+        super().record(sql, duration, params, connection)
+        if len(self.queries) < settings.PROFILE_MAX_QUERIES:
+            self.queries.append({'sql': sql, 'ms': round(duration * 1000, 3), 'stack': query_origin()})
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's stack from a background thread every ``interval`` seconds.
+    Much cheaper than cProfile on the profiled code; the report is in the "folded"
+    format flame graph tools read (``frame;frame;frame count`` per line).
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval or settings.PROFILE_SAMPLE_INTERVAL
+        self.samples = Counter()
+        self._stop = threading.Event()
+
+    def start(self):
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name='request-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def report(self, lines):
+        return '\n'.join(f"{stack} {count}" for stack, count in self.samples.most_common(lines)), None
+
+
+class CProfiler:
+    def start(self):
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def report(self, lines):
+        out = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=out)
+        stats.sort_stats('cumulative').print_stats(lines)
+        # Same bytes pstats.Stats.dump_stats() writes, so the admin download opens in pstats/snakeviz.
+        return out.getvalue(), marshal.dumps(stats.stats)
+
+
+def save_profile(request, response, user, mode, profiler, queries, duration):
+    report, stats = profiler.report(settings.PROFILE_REPORT_LINES)
+    profile = RequestProfile.objects.create(
+        user=user, method=request.method, path=request.get_full_path()[:500], view_name=view_label(request),
+        status_code=response.status_code, mode=mode, duration=duration, query_count=queries.count,
+        query_time=queries.duration, report=report, queries=queries.queries, stats=stats,
+    )
+    # Keep only the most recent PROFILE_KEEP profiles.
+    stale = RequestProfile.objects.order_by('-created_at', '-pk').values_list('pk', flat=True)[settings.PROFILE_KEEP:]
+    RequestProfile.objects.filter(pk__in=list(stale)).delete()
+    return profile
+
+
+class ProfilingMiddleware:
+    """
+    Run one request under a profiler when it carries a staff token (``?_profile=`` or
+    the X-Profile-Token header; staff get one from /profile/token/). The profile and an
+    SQL log with the code each query came from are stored as a RequestProfile, and the
+    response gets an X-Profile-Id header. Profilers watch the thread that runs this
+    middleware: for async views, code in sync_to_async threads shows up as time spent
+    awaiting, though its queries are still logged.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = pop_profile_token(request)
+        granted = read_profile_token(token) if token else None
+        if granted is None:
+            return self.get_response(request)
+        user, mode = granted
+        profiler = SamplingProfiler() if mode == 'sample' else CProfiler()
+        with count_context_queries(QueryLog()) as queries:
+            started = time.perf_counter()
+            profiler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.stop()
+            duration = time.perf_counter() - started
+        return self.finish(request, response, user, mode, profiler, queries, duration)
+
+    async def __acall__(self, request):
+        token = pop_profile_token(request)
+        granted = await sync_to_async(read_profile_token)(token) if token else None
+        if granted is None:
+            return await self.get_response(request)
+        user, mode = granted
+        profiler = SamplingProfiler() if mode == 'sample' else CProfiler()
+        with count_context_queries(QueryLog()) as queries:
+            started = time.perf_counter()
+            profiler.start()
+            try:
+                response = await self.get_response(request)
+            finally:
+                profiler.stop()
+            duration = time.perf_counter() - started
+        return await sync_to_async(self.finish)(request, response, user, mode, profiler, queries, duration)
+
+    def finish(self, request, response, user, mode, profiler, queries, duration):
+        try:
+            profile = save_profile(request, response, user, mode, profiler, queries, duration)
+        except Exception:
+            # Profiling must never break the request it was measuring.
+            logger.exception("Could not store the profile of %s", request.path)
+        else:
+            response['X-Profile-Id'] = str(profile.pk)
+        return response
@@ -0,0 +1,156 @@
+import functools
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    """Counts queries and the time spent executing them."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, time.perf_counter() - started, None if many else params, context['connection'])
+
+    def record(self, sql, duration, params=None, connection=None):
+        self.count += 1
+        self.duration += duration
+
+
+# Async views run their queries on sync_to_async worker threads, whose connections a
+# per-connection execute_wrapper set up on the event loop never sees. Every connection
+# therefore carries one permanent wrapper that counts into the counters of the current
+# context; contextvars follow the view into those threads.
+_context_counters = ContextVar('query_counters', default=())
+
+
+def _count_in_context(execute, sql, params, many, context):
+    counters = _context_counters.get()
+    if not counters:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        for counter in counters:
+            counter.record(sql, elapsed, None if many else params, context['connection'])
+
+
+@contextmanager
+def count_context_queries(counter=None):
+    """
+    Count the queries of the current context (request), whichever thread runs them.
+    ``counter`` may be any QueryCounter (subclasses can override ``record``).
+    """
+    counter = counter or QueryCounter()
+    token = _context_counters.set(_context_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _context_counters.reset(token)
+
+
+def install_context_counter(sender, connection, **kwargs):
+    if _count_in_context not in connection.execute_wrappers:
+        # First in line, so execute_wrapper()'s pop() of its own wrapper never removes it.
+        connection.execute_wrappers.insert(0, _count_in_context)
+
+
+connection_created.connect(install_context_counter)
+for _connection in connections.all(initialized_only=True):
+    if _connection.connection is not None:
+        install_context_counter(None, _connection)
+
+
+@contextmanager
+def count_queries():
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+def get_budget_mode():
+    # 'raise' fails loudly, 'log' only warns, 'off' skips counting entirely.
+    return getattr(settings, 'QUERY_BUDGET_MODE', 'raise' if settings.DEBUG else 'log')
+
+
+def check_budget(label, used, budget, mode):
+    if used <= budget:
+        return
+    message = f"{label} ran {used} queries, over its budget of {budget}"
+    if mode == 'raise':
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+def query_budget(max_queries):
+    """
+    Declare how many queries a view may run, template rendering included.
+    Use ``method_decorator(query_budget(n), name='dispatch')`` on class-based views.
+    Works on ``async def`` views too.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            return _async_budget(view, max_queries)
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            mode = get_budget_mode()
+            if mode == 'off':
+                return view(request, *args, **kwargs)
+            with count_queries() as counter:
+                response = view(request, *args, **kwargs)
+                # TemplateResponses render lazily; render inside the budget so template queries count.
+                if hasattr(response, 'render') and not response.is_rendered:
+                    response.render()
+            check_budget(request.path, counter.count, max_queries, mode)
+            return response
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
+
+
+def _async_budget(view, max_queries):
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        mode = get_budget_mode()
+        if mode == 'off':
+            return await view(request, *args, **kwargs)
+        with count_context_queries() as counter:
+            response = await view(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                await sync_to_async(response.render)()
+        check_budget(request.path, counter.count, max_queries, mode)
+        return response
+    markcoroutinefunction(wrapper)
+    wrapper.query_budget = max_queries
+    return wrapper
+
+
+@contextmanager
+def assert_max_queries(max_queries, label='Block'):
+    """Test helper: fail if the enclosed block runs more than ``max_queries`` queries."""
+    with count_queries() as counter:
+        yield counter
+    check_budget(label, counter.count, max_queries, 'raise')
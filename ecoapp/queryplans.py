@@ -0,0 +1,103 @@
+import datetime
+import random
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.utils import timezone
+
+from .models import ActivityRollup, EcoAction, Event, LoginActivity, SearchLog, Upload, VisitTracker
+from .pagination import encode_cursor, keyset_queryset
+from .rollups import rebuild_rollups
+
+User = get_user_model()
+
+# SQLite prefixes each plan row with its id/parent columns or tree drawing characters.
+PLAN_PREFIX_RE = re.compile(r'^[\d\s|`-]*')
+
+
+def hot_queries(user_id, now):
+    """The filters and orderings the request path runs, keyed by where they come from."""
+    return {
+        'action_list': EcoAction.objects.select_related('category').order_by('-created_at', 'pk')[:21],
+        'event_list': Event.objects.order_by('-date', 'pk')[:21],
+        # The seek predicate keyset_paginate adds for a cursor, not just date < cursor
+        'event_list_page_2': keyset_queryset(Event.objects.all(), 'date', encode_cursor(now.date(), 1))[:21],
+        'user_uploads': Upload.objects.filter(user_id=user_id).order_by('-uploaded_at', 'pk')[:21],
+        'user_history': ActivityRollup.objects.filter(user_id=user_id, period='day', login_days__gt=0).order_by('-period_start'),
+        'login_activity': LoginActivity.objects.filter(user_id=user_id).order_by('-login_date'),
+        'user_visits': VisitTracker.objects.filter(user_id=user_id).order_by('-visit_time')[:50],
+        'searchlog_compaction': SearchLog.objects.filter(searched_at__lt=now).order_by('searched_at', 'pk')[:5000],
+        'visit_archive': VisitTracker.objects.filter(visit_time__lt=now).order_by('visit_time', 'pk')[:2000],
+        'login_archive': LoginActivity.objects.filter(login_date__lt=now.date()).order_by('login_date', 'pk')[:2000],
+    }
+
+
+def query_plan(queryset):
+    """EXPLAIN QUERY PLAN (or the backend's EXPLAIN) output for ``queryset``."""
+    return queryset.explain()
+
+
+def plan_problems(plan):
+    """
+    Lines showing a full table scan or a sort the index didn't satisfy. SQLite writes
+    ``SCAN table`` for a full scan and ``SCAN table USING INDEX ...`` for an index walk;
+    PostgreSQL writes ``Seq Scan``.
+    """
+    problems = []
+    for line in plan.splitlines():
+        step = PLAN_PREFIX_RE.sub('', line).strip()
+        if (step.startswith('SCAN') and 'USING' not in step) or 'USE TEMP B-TREE' in step or 'Seq Scan' in step:
+            problems.append(step)
+    return problems
+
+
+def seed_tables(rows=20000, users=50, seed=1):
+    """Bulk insert ``rows`` rows per hot table so the planner has realistic sizes to work with."""
+    rng = random.Random(seed)
+    now = timezone.now()
+    people = User.objects.bulk_create([User(username=f'qp-user-{seed}-{i}') for i in range(users)])
+    user_ids = [user.pk for user in people]
+
+    def when(days=720):
+        return now - datetime.timedelta(seconds=rng.randrange(days * 86400))
+
+    EcoAction.objects.bulk_create(
+        [EcoAction(title=f'Action {i}', description='', user_id=rng.choice(user_ids)) for i in range(rows)],
+        batch_size=1000,
+    )
+    Event.objects.bulk_create([
+        Event(title=f'Event {i}', description='', user_id=rng.choice(user_ids), date=when().date(),
+              time=datetime.time(10, 0), location='', city='')
+        for i in range(rows)
+    ], batch_size=1000)
+    Upload.objects.bulk_create(
+        [Upload(title=f'Upload {i}', description='', user_id=rng.choice(user_ids), file='uploads/x') for i in range(rows)],
+        batch_size=1000,
+    )
+    LoginActivity.objects.bulk_create(
+        [LoginActivity(user_id=user_id, login_date=(now - datetime.timedelta(days=day)).date())
+         for user_id in user_ids for day in range(rows // users)],
+        batch_size=1000,
+    )
+    VisitTracker.objects.bulk_create(
+        [VisitTracker(user_id=rng.choice(user_ids), ip_address='127.0.0.1', visit_time=when()) for _ in range(rows)],
+        batch_size=1000,
+    )
+    SearchLog.objects.bulk_create([SearchLog(query=f'query {i % 500}') for i in range(rows)], batch_size=1000)
+    # Benchmark tables only: leave any real archive out.
+    rebuild_rollups(include_archived=False)
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    return user_ids
+
+
+def check_query_plans(user_id, now=None):
+    """Return ``{name: (plan, problems)}`` for every hot query."""
+    now = now or timezone.now()
+    results = {}
+    for name, queryset in hot_queries(user_id, now).items():
+        plan = query_plan(queryset)
+        results[name] = (plan, plan_problems(plan))
+    return results
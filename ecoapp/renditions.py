@@ -0,0 +1,106 @@
+import logging
+import os
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+ORIENTATION_TAG = 0x0112
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tif', '.tiff'}
+
+_executor = None
+
+
+def is_image(name):
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+
+def rendition_name(name, width):
+    """uploads/photo.jpg -> uploads/renditions/photo.jpg-640w.webp"""
+    # The extension stays in, so photo.jpg and photo.png don't share renditions.
+    directory, filename = posixpath.split(name)
+    return posixpath.join(directory, 'renditions', f'{filename}-{width}w.webp')
+
+
+def upright_width(image):
+    """Width once the EXIF orientation is applied, read from the header alone."""
+    if image.getexif().get(ORIENTATION_TAG) in (5, 6, 7, 8):
+        return image.height
+    return image.width
+
+
+def generate_renditions(name, storage=default_storage):
+    """Write a WebP rendition of ``name`` for every configured width smaller than the original."""
+    try:
+        with storage.open(name, 'rb') as original:
+            # Image.open only reads the header: decode only if a rendition is missing.
+            image = Image.open(original)
+            targets = {
+                width: rendition_name(name, width)
+                for width in settings.RENDITION_WIDTHS if width < upright_width(image)
+            }
+            targets = {width: target for width, target in targets.items() if not storage.exists(target)}
+            if not targets:
+                return []
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except (OSError, UnidentifiedImageError):
+        logger.warning("Could not read %s for renditions", name, exc_info=True)
+        return []
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    created = []
+    for width, target in sorted(targets.items()):
+        resized = image.copy()
+        resized.thumbnail((width, image.height), Image.LANCZOS)
+        buffer = BytesIO()
+        resized.save(buffer, 'WEBP', quality=settings.RENDITION_QUALITY, method=4)
+        storage.save(target, ContentFile(buffer.getvalue()))
+        created.append(target)
+    return created
+
+
+def _generate_safely(name):
+    try:
+        generate_renditions(name)
+    except Exception:
+        logger.exception("Generating renditions for %s failed", name)
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.RENDITION_WORKERS, thread_name_prefix='renditions')
+    return _executor
+
+
+def schedule_renditions(field_file):
+    """Queue rendition generation for an image field once the surrounding transaction commits."""
+    if not field_file or not is_image(field_file.name):
+        return
+    name = field_file.name
+    if settings.RENDITION_ASYNC:
+        transaction.on_commit(lambda: get_executor().submit(_generate_safely, name))
+    else:
+        transaction.on_commit(lambda: _generate_safely(name))
+
+
+def available_renditions(field_file, storage=default_storage):
+    """Return ``[(width, url)]`` for the renditions of ``field_file`` that exist, narrowest first."""
+    if not field_file or not is_image(field_file.name):
+        return []
+    renditions = []
+    for width in sorted(settings.RENDITION_WIDTHS):
+        name = rendition_name(field_file.name, width)
+        if not storage.exists(name):
+            break
+        renditions.append((width, storage.url(name)))
+    return renditions
@@ -0,0 +1,155 @@
+import datetime
+import gzip
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .autocomplete import fold_search_counts
+from .models import LoginActivity, SearchLog, VisitTracker
+
+# Append-only logs that can be archived: name -> (model, timestamp field)
+ARCHIVED_LOGS = {
+    'visits': (VisitTracker, 'visit_time'),
+    'searches': (SearchLog, 'searched_at'),
+    'logins': (LoginActivity, 'login_date'),
+}
+
+
+def archive_dir(name):
+    return os.path.join(settings.ARCHIVE_ROOT, name)
+
+
+def archive_path(name, month):
+    return os.path.join(archive_dir(name), f'{month:%Y-%m}.jsonl.gz')
+
+
+def as_date(value):
+    if isinstance(value, datetime.datetime):
+        return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+    return value
+
+
+def month_of(value):
+    return as_date(value).replace(day=1)
+
+
+def cutoff_for(name, days, now=None):
+    """Rows strictly older than this are archived: a datetime, or a date for date fields."""
+    model, field = ARCHIVED_LOGS[name]
+    cutoff = (now or timezone.now()) - datetime.timedelta(days=days)
+    if model._meta.get_field(field).get_internal_type() == 'DateField':
+        return timezone.localdate(cutoff)
+    return cutoff
+
+
+def append_rows(name, month, rows):
+    """
+    Append rows to the month's file as a new gzip member (gzip readers read the members
+    back to back), so archiving never rewrites what is already there.
+    """
+    os.makedirs(archive_dir(name), exist_ok=True)
+    data = ''.join(json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in rows).encode()
+    with open(archive_path(name, month), 'ab') as f:
+        f.write(gzip.compress(data))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def archive_log(name, before, chunk_size=None, pause=0, dry_run=False):
+    """
+    Move rows of log ``name`` older than ``before`` into monthly gzip JSONL files.
+
+    Works in chunks of ``chunk_size`` rows: each chunk is written (and fsynced) first,
+    then deleted in its own short transaction, with ``pause`` seconds between chunks so
+    other writers get the database. A crash between the two steps leaves the chunk both
+    archived and live; the next run archives it again and readers drop the duplicates.
+    Search counts are folded into SearchQueryCount on the way out, as compaction does.
+    Returns ``{month: rows}``.
+    """
+    model, field = ARCHIVED_LOGS[name]
+    chunk_size = chunk_size or settings.ARCHIVE_CHUNK_SIZE
+    columns = [f.attname for f in model._meta.concrete_fields]
+    old = model.objects.filter(**{f'{field}__lt': before}).order_by(field, 'pk')
+    archived = {}
+    if dry_run:
+        for value in old.values_list(field, flat=True).iterator():
+            month = month_of(value)
+            archived[month] = archived.get(month, 0) + 1
+        return archived
+    while True:
+        rows = list(old.values(*columns)[:chunk_size])
+        if not rows:
+            return archived
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(month_of(row[field]), []).append(row)
+        for month, month_rows in by_month.items():
+            append_rows(name, month, month_rows)
+            archived[month] = archived.get(month, 0) + len(month_rows)
+        ids = [row['id'] for row in rows]
+        with transaction.atomic():
+            if model is SearchLog:
+                fold_search_counts(ids)
+            model.objects.filter(pk__in=ids).delete()
+        if pause:
+            time.sleep(pause)
+
+
+def archived_months(name):
+    """Months with an archive file for log ``name``, oldest first."""
+    try:
+        files = os.listdir(archive_dir(name))
+    except FileNotFoundError:
+        return []
+    return sorted(
+        datetime.date(int(f[:4]), int(f[5:7]), 1) for f in files if f.endswith('.jsonl.gz')
+    )
+
+
+def as_bound(value, date_field):
+    """Compare like with like: dates for date fields, aware datetimes otherwise."""
+    if value is None:
+        return None
+    if date_field:
+        return as_date(value)
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+def read_archive(name, start=None, end=None, **filters):
+    """
+    Yield archived rows of log ``name`` as dicts of field values (parsed back into
+    dates, datetimes...), optionally limited to ``start <= timestamp < end`` and to
+    rows whose fields equal ``filters`` (e.g. ``user_id=3``). Only the month files
+    overlapping the range are opened; memory use is one month's primary keys.
+    """
+    model, field = ARCHIVED_LOGS[name]
+    fields = {f.attname: f for f in model._meta.concrete_fields}
+    date_field = fields[field].get_internal_type() == 'DateField'
+    start, end = as_bound(start, date_field), as_bound(end, date_field)
+    first = month_of(start) if start else None
+    last = month_of(end) if end else None
+    for month in archived_months(name):
+        if (first and month < first) or (last and month > last):
+            continue
+        seen = set()
+        with gzip.open(archive_path(name, month), 'rt') as f:
+            for line in f:
+                raw = json.loads(line)
+                if raw['id'] in seen:
+                    continue
+                seen.add(raw['id'])
+                row = {attname: fields[attname].to_python(value) for attname, value in raw.items()}
+                if start and row[field] < start:
+                    continue
+                if end and row[field] >= end:
+                    continue
+                if any(row.get(key) != value for key, value in filters.items()):
+                    continue
+                yield row
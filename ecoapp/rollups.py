@@ -0,0 +1,108 @@
+import datetime
+from collections import defaultdict
+
+from django.apps import apps as django_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .retention import read_archive
+
+PERIODS = ('day', 'week', 'month')
+
+
+def period_start(period, day):
+    if period == 'week':
+        return day - datetime.timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def add_activity(deltas, user_id, day, login_days=0, visits=0):
+    """Accumulate one user's activity on ``day`` into every period, for the user and site-wide."""
+    scopes = (user_id, None) if user_id is not None else (None,)
+    for period in PERIODS:
+        start = period_start(period, day)
+        for scope in scopes:
+            counts = deltas[(scope, period, start)]
+            counts[0] += login_days
+            counts[1] += visits
+
+
+def new_deltas():
+    return defaultdict(lambda: [0, 0])
+
+
+def apply_deltas(deltas, apps=django_apps):
+    ActivityRollup = apps.get_model('ecoapp', 'ActivityRollup')
+    with transaction.atomic():
+        for (user_id, period, start), (login_days, visits) in deltas.items():
+            rows = ActivityRollup.objects.filter(user_id=user_id, period=period, period_start=start)
+            if rows.update(login_days=F('login_days') + login_days, visits=F('visits') + visits):
+                continue
+            try:
+                with transaction.atomic():
+                    ActivityRollup.objects.create(
+                        user_id=user_id, period=period, period_start=start,
+                        login_days=login_days, visits=visits,
+                    )
+            except IntegrityError:
+                # Another worker created the row first.
+                rows.update(login_days=F('login_days') + login_days, visits=F('visits') + visits)
+
+
+def record_login_day(user_id, day):
+    deltas = new_deltas()
+    add_activity(deltas, user_id, day, login_days=1)
+    apply_deltas(deltas)
+
+
+def record_visits(visits):
+    """``visits`` is an iterable of (user_id, visit_time)."""
+    deltas = new_deltas()
+    for user_id, visit_time in visits:
+        add_activity(deltas, user_id, timezone.localdate(visit_time), visits=1)
+    apply_deltas(deltas)
+
+
+def rebuild_rollups(apps=django_apps, include_archived=True):
+    """
+    Recompute every rollup from LoginActivity and VisitTracker and, unless
+    ``include_archived`` is False, their archived rows (ecoapp.retention). Existing
+    rollups are replaced, so leaving the archive out drops its history.
+    """
+    ActivityRollup = apps.get_model('ecoapp', 'ActivityRollup')
+    LoginActivity = apps.get_model('ecoapp', 'LoginActivity')
+    VisitTracker = apps.get_model('ecoapp', 'VisitTracker')
+
+    deltas = new_deltas()
+    for user_id, day in LoginActivity.objects.values_list('user_id', 'login_date').iterator():
+        add_activity(deltas, user_id, day, login_days=1)
+    daily_visits = (
+        VisitTracker.objects.filter(user__isnull=False)
+        .annotate(day=TruncDate('visit_time'))
+        .values_list('user_id', 'day')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    for user_id, day, total in daily_visits.iterator():
+        add_activity(deltas, user_id, day, visits=total)
+    if include_archived:
+        for row in read_archive('logins'):
+            add_activity(deltas, row['user_id'], row['login_date'], login_days=1)
+        for row in read_archive('visits'):
+            if row['user_id'] is not None:
+                add_activity(deltas, row['user_id'], timezone.localdate(row['visit_time']), visits=1)
+
+    with transaction.atomic():
+        ActivityRollup.objects.all().delete()
+        ActivityRollup.objects.bulk_create(
+            [
+                ActivityRollup(user_id=user_id, period=period, period_start=start, login_days=login_days, visits=visits)
+                for (user_id, period, start), (login_days, visits) in deltas.items()
+            ],
+            batch_size=1000,
+        )
+    return len(deltas)
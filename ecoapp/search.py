@@ -0,0 +1,189 @@
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .caching import search_cache
+from .models import EcoAction, Upload, Event
+
+# Searchable models: title field first (ranked higher), then the body fields.
+# Models with an owner field only return rows belonging to that user.
+SEARCH_FIELDS = {
+    EcoAction: ('title', ('description',)),
+    Upload: ('title', ('description',)),
+    Event: ('title', ('description', 'location', 'city')),
+}
+SEARCH_OWNER_FIELD = {
+    Upload: 'user',
+}
+# Relations the search results template reads for every row.
+SEARCH_RELATED = {
+    EcoAction: ('user',),
+    Upload: ('user',),
+    Event: ('user',),
+}
+
+DEFAULT_LIMIT = 100
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+class BaseSearchBackend:
+    """Interface every search backend implements. Results are primary keys, best match first."""
+
+    def index(self, obj):
+        raise NotImplementedError
+
+    def remove(self, model, pk):
+        raise NotImplementedError
+
+    def rebuild(self, model):
+        raise NotImplementedError
+
+    def search_ids(self, model, query, owner=None, limit=DEFAULT_LIMIT):
+        raise NotImplementedError
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    # Plain LIKE scans; works on any database but does not scale.
+
+    def index(self, obj):
+        pass
+
+    def remove(self, model, pk):
+        pass
+
+    def rebuild(self, model):
+        return model._default_manager.count()
+
+    def search_ids(self, model, query, owner=None, limit=DEFAULT_LIMIT):
+        title_field, body_fields = SEARCH_FIELDS[model]
+        condition = Q()
+        for field in (title_field,) + body_fields:
+            condition |= Q(**{f'{field}__icontains': query})
+        qs = model._default_manager.filter(condition)
+        if model in SEARCH_OWNER_FIELD:
+            qs = qs.filter(**{SEARCH_OWNER_FIELD[model]: owner})
+        return list(qs.order_by('-pk').values_list('pk', flat=True)[:limit])
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    # One FTS5 table per model, keyed by rowid = pk. Tables are created by migration 0005.
+
+    @staticmethod
+    def table_name(model):
+        return f'ecoapp_fts_{model._meta.model_name}'
+
+    def _document(self, obj):
+        title_field, body_fields = SEARCH_FIELDS[type(obj)]
+        body = ' '.join(str(getattr(obj, field) or '') for field in body_fields)
+        owner_field = SEARCH_OWNER_FIELD.get(type(obj))
+        owner_id = getattr(obj, f'{owner_field}_id') if owner_field else None
+        return getattr(obj, title_field) or '', body, owner_id
+
+    def index(self, obj):
+        title, body, owner_id = self._document(obj)
+        table = self.table_name(type(obj))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [obj.pk])
+            cursor.execute(
+                f'INSERT INTO {table} (rowid, title, body, owner_id) VALUES (%s, %s, %s, %s)',
+                [obj.pk, title, body, owner_id],
+            )
+
+    def remove(self, model, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table_name(model)} WHERE rowid = %s', [pk])
+
+    def rebuild(self, model):
+        count = 0
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {self.table_name(model)}')
+            for obj in model._default_manager.order_by('pk').iterator(chunk_size=2000):
+                self.index(obj)
+                count += 1
+        return count
+
+    def search_ids(self, model, query, owner=None, limit=DEFAULT_LIMIT):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        # Quote every term so user input can't inject FTS syntax; '*' gives prefix matching.
+        match = ' '.join(f'"{term}"*' for term in terms)
+        table = self.table_name(model)
+        sql = f'SELECT rowid FROM {table} WHERE {table} MATCH %s'
+        params = [match]
+        if model in SEARCH_OWNER_FIELD:
+            sql += ' AND owner_id = %s'
+            params.append(owner.pk if owner is not None else None)
+        sql += f' ORDER BY bm25({table}, 10.0, 1.0) LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+
+_backend = None
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'SEARCH_BACKEND', None)
+        if path:
+            _backend = import_string(path)()
+        elif connection.vendor == 'sqlite':
+            _backend = SQLiteFTSBackend()
+        else:
+            _backend = DatabaseSearchBackend()
+    return _backend
+
+
+def search_scope(model, owner_id=None):
+    # Result cache scope: owned models get one scope per owner so results never leak.
+    if model in SEARCH_OWNER_FIELD:
+        return f'{model._meta.model_name}:{owner_id}'
+    return model._meta.model_name
+
+
+def result_queryset(model, owner=None):
+    # Cached ids can go stale (an upload changing owner), so ownership is checked again here.
+    queryset = model._default_manager.select_related(*SEARCH_RELATED.get(model, ()))
+    if model in SEARCH_OWNER_FIELD:
+        queryset = queryset.filter(**{SEARCH_OWNER_FIELD[model]: owner})
+    return queryset
+
+
+def search(model, query, owner=None, limit=DEFAULT_LIMIT):
+    """Return matching objects for ``model`` in rank order."""
+    if model in SEARCH_OWNER_FIELD and owner is None:
+        return []
+    scope = search_scope(model, owner.pk if owner is not None else None)
+    key, ids = search_cache.get(scope, query, limit)
+    if ids is None:
+        ids = get_search_backend().search_ids(model, query, owner=owner, limit=limit)
+        search_cache.set(key, ids)
+    objects = result_queryset(model, owner).in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
+
+
+async def asearch(model, query, owner=None, limit=DEFAULT_LIMIT):
+    """
+    Async ``search``. Calls can be awaited together with ``asyncio.gather``, but their
+    queries share the thread-sensitive executor and so still run one at a time.
+    """
+    if model in SEARCH_OWNER_FIELD and owner is None:
+        return []
+    scope = search_scope(model, owner.pk if owner is not None else None)
+    key, ids = search_cache.get(scope, query, limit)
+    if ids is None:
+        ids = await sync_to_async(get_search_backend().search_ids)(model, query, owner=owner, limit=limit)
+        search_cache.set(key, ids)
+    objects = await result_queryset(model, owner).ain_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
@@ -1,9 +1,74 @@
 from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.utils.timezone import now
-from .models import LoginActivity
+from .models import EcoAction, Upload, Event, SiteSettings, TeamMember, Category
+from .search import get_search_backend, search_scope
+from .caching import bump_generation, invalidate_site_settings, search_cache
+from .tasks import record_logins
+from .renditions import schedule_renditions
+from .storage import file_digest
 
+# Deferred to the task queue (ecoapp.tasks), batched with other logins
 @receiver(user_logged_in)
 def log_login_activity(sender, user, request, **kwargs):
-    today = now().date()
-    LoginActivity.objects.get_or_create(user=user, login_date=today)
+    record_logins.enqueue(user=user.pk, date=now().date())
+
+
+# Keep the search index in sync with searchable models
+@receiver(post_save, sender=EcoAction)
+@receiver(post_save, sender=Upload)
+@receiver(post_save, sender=Event)
+def update_search_index(sender, instance, **kwargs):
+    get_search_backend().index(instance)
+    search_cache.invalidate(search_scope(sender, getattr(instance, 'user_id', None)))
+
+@receiver(post_delete, sender=EcoAction)
+@receiver(post_delete, sender=Upload)
+@receiver(post_delete, sender=Event)
+def remove_from_search_index(sender, instance, **kwargs):
+    get_search_backend().remove(sender, instance.pk)
+    search_cache.invalidate(search_scope(sender, getattr(instance, 'user_id', None)))
+
+
+# Drop the cached SiteSettings whenever the row changes
+@receiver(post_save, sender=SiteSettings)
+@receiver(post_delete, sender=SiteSettings)
+def invalidate_site_settings_cache(sender, instance, **kwargs):
+    invalidate_site_settings()
+
+
+# Expire cached public pages that render these models
+@receiver(post_save, sender=SiteSettings)
+@receiver(post_save, sender=TeamMember)
+@receiver(post_save, sender=EcoAction)
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=SiteSettings)
+@receiver(post_delete, sender=TeamMember)
+@receiver(post_delete, sender=EcoAction)
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=Category)
+def expire_public_pages(sender, instance, **kwargs):
+    bump_generation(sender)
+
+
+# Record the content digest before FileField picks the (content-addressed) file name
+@receiver(pre_save, sender=Upload)
+def upload_digest(sender, instance, **kwargs):
+    if instance.file and not instance.file._committed:
+        instance.sha256 = file_digest(instance.file.file)
+
+
+# Resize uploaded images outside the request
+@receiver(post_save, sender=Upload)
+def upload_renditions(sender, instance, **kwargs):
+    schedule_renditions(instance.file)
+
+@receiver(post_save, sender=Event)
+def event_renditions(sender, instance, **kwargs):
+    schedule_renditions(instance.image)
+
+@receiver(post_save, sender=TeamMember)
+def team_member_renditions(sender, instance, **kwargs):
+    schedule_renditions(instance.photo)
@@ -0,0 +1,280 @@
+import atexit
+import functools
+import hashlib
+import logging
+import re
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, close_old_connections, connections, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .metrics import view_label
+from .models import SlowQuery
+from .querybudget import QueryCounter, count_context_queries
+
+logger = logging.getLogger(__name__)
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_RE = re.compile(r'%s|\?')
+IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+ROWS_RE = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+SPACE_RE = re.compile(r'\s+')
+
+
+@functools.lru_cache(maxsize=2048)
+def normalize_sql(sql):
+    """
+    The shape of a statement: literals and placeholders become ``?`` and lists of them
+    ``(...)``, so ``IN (1, 2)`` and ``IN (3, 4, 5)`` share a fingerprint. Cached, as the
+    ORM sends the same few statement strings over and over.
+    """
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = PLACEHOLDER_RE.sub('?', sql)
+    sql = IN_LIST_RE.sub('(...)', sql)
+    sql = ROWS_RE.sub('(...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.md5(normalized_sql.encode()).hexdigest()
+
+
+class QueryShapes(QueryCounter):
+    """Per-request execution stats for each statement shape, plus its slowest instance."""
+
+    def __init__(self, threshold):
+        super().__init__()
+        self.threshold = threshold
+        self.shapes = {}
+
+    def record(self, sql, duration, params=None, connection=None):
+        super().record(sql, duration, params, connection)
+        normalized = normalize_sql(sql)
+        shape = self.shapes.get(normalized)
+        if shape is None:
+            shape = self.shapes[normalized] = {
+                'executions': 0, 'slow_executions': 0, 'total_time': 0.0, 'max_time': -1.0, 'example': None,
+            }
+        shape['executions'] += 1
+        shape['total_time'] += duration
+        if duration >= self.threshold:
+            shape['slow_executions'] += 1
+        if duration > shape['max_time']:
+            shape['max_time'] = duration
+            shape['example'] = (sql, params, connection.alias)
+
+
+def explain(sql, params, alias):
+    """The database's plan for a SELECT, or '' when it can't be explained."""
+    if params is None or not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return ''
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            rows = cursor.fetchall()
+    except DatabaseError:
+        logger.debug("Could not explain %s", sql, exc_info=True)
+        return ''
+    return '\n'.join(' '.join(str(column) for column in row) for row in rows)
+
+
+def store_shape(view_name, normalized, shape, plan):
+    """Add one buffered aggregate (see SlowQueryBuffer) to its SlowQuery row."""
+    key = {'fingerprint': fingerprint(normalized), 'view_name': view_name[:200]}
+    example = shape['example'][0]
+    slow = shape['slow_executions'] > 0
+    changes = {
+        'requests': F('requests') + shape['requests'],
+        'executions': F('executions') + shape['executions'],
+        'slow_executions': F('slow_executions') + shape['slow_executions'],
+        'total_time': F('total_time') + shape['total_time'],
+        'max_time': Greatest(F('max_time'), shape['max_time']),
+        'max_per_request': Greatest(F('max_per_request'), shape['max_per_request']),
+        'last_seen': timezone.now(),
+    }
+    if slow:
+        changes.update(example=example, explain=plan)
+    if SlowQuery.objects.filter(**key).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            SlowQuery.objects.create(
+                **key, sql=normalized, example=example, explain=plan, requests=shape['requests'],
+                executions=shape['executions'], slow_executions=shape['slow_executions'],
+                total_time=shape['total_time'], max_time=shape['max_time'],
+                max_per_request=shape['max_per_request'],
+            )
+    except IntegrityError:
+        # Another worker created the row first.
+        SlowQuery.objects.filter(**key).update(**changes)
+
+
+def flagged_shapes(shapes):
+    """The shapes of one request that ran slowly or SLOW_QUERY_REPEAT_THRESHOLD+ times."""
+    for normalized, shape in shapes.shapes.items():
+        if shape['slow_executions'] or shape['executions'] >= settings.SLOW_QUERY_REPEAT_THRESHOLD:
+            yield normalized, shape
+
+
+class SlowQueryBuffer:
+    """
+    Aggregates flagged shapes in memory, per view and fingerprint, and writes them out
+    (EXPLAIN included) every ``flush_interval`` seconds, so requests only pay for a dict
+    update. At most ``max_entries`` aggregates are pending; new ones beyond that are
+    dropped (and counted in ``dropped``). Flushing happens on a background thread, or
+    with ``background=False`` inline by the request that finds the interval elapsed.
+    """
+
+    def __init__(self, max_entries=1000, flush_interval=10.0, background=False):
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self.background = background
+        self.dropped = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._run, name='slow-query-buffer', daemon=True)
+            self._thread.start()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def record(self, view_name, shapes):
+        with self._lock:
+            for normalized, shape in shapes:
+                key = (view_name, normalized)
+                pending = self._pending.get(key)
+                if pending is None:
+                    if len(self._pending) >= self.max_entries:
+                        self.dropped += 1
+                        continue
+                    pending = self._pending[key] = {
+                        'requests': 0, 'executions': 0, 'slow_executions': 0, 'total_time': 0.0,
+                        'max_time': -1.0, 'max_per_request': 0, 'example': None,
+                    }
+                pending['requests'] += 1
+                pending['executions'] += shape['executions']
+                pending['slow_executions'] += shape['slow_executions']
+                pending['total_time'] += shape['total_time']
+                pending['max_per_request'] = max(pending['max_per_request'], shape['executions'])
+                if shape['max_time'] > pending['max_time']:
+                    pending['max_time'] = shape['max_time']
+                    pending['example'] = shape['example']
+        if not self.background and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write the pending aggregates; returns how many were stored."""
+        if not self._flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._last_flush = time.monotonic()
+            stored = 0
+            for (view_name, normalized), shape in pending.items():
+                plan = ''
+                if shape['slow_executions'] and settings.SLOW_QUERY_EXPLAIN:
+                    plan = explain(*shape['example'])
+                try:
+                    store_shape(view_name, normalized, shape, plan)
+                except Exception:
+                    logger.exception("Could not record slow query of %s", view_name)
+                    continue
+                stored += 1
+            return stored
+        finally:
+            self._flush_lock.release()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            close_old_connections()
+            self.flush()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_slow_query_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = SlowQueryBuffer(
+                    max_entries=settings.SLOW_QUERY_BUFFER_SIZE,
+                    flush_interval=settings.SLOW_QUERY_FLUSH_INTERVAL,
+                    background=settings.SLOW_QUERY_FLUSH_THREAD,
+                )
+                atexit.register(_buffer.flush)
+    return _buffer
+
+
+def record_slow_queries(request, shapes):
+    """Hand the flagged shapes of one request to the buffer; returns how many there were."""
+    view_name = view_label(request)
+    flagged = list(flagged_shapes(shapes))
+    for normalized, shape in flagged:
+        if shape['slow_executions']:
+            logger.warning("Slow query in %s (%.1f ms): %s", view_name, shape['max_time'] * 1000, shape['example'][0])
+    if flagged:
+        get_slow_query_buffer().record(view_name, flagged)
+    return len(flagged)
+
+
+def is_watched(request):
+    match = getattr(request, 'resolver_match', None)
+    return match is not None and bool(set(match.app_names) & set(settings.SLOW_QUERY_APPS))
+
+
+class SlowQueryMiddleware:
+    """
+    Time every statement run while serving views of SLOW_QUERY_APPS (through the
+    per-context execute_wrapper from querybudget) and, once the response is ready,
+    buffer the shapes that were slow (SLOW_QUERY_THRESHOLD_MS) or repeated within the
+    request (SLOW_QUERY_REPEAT_THRESHOLD, i.e. N+1 lookups). SlowQueryBuffer writes them
+    into SlowQuery rows off the request path, EXPLAINing slow SELECTs with their original
+    parameters.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with count_context_queries(QueryShapes(settings.SLOW_QUERY_THRESHOLD_MS / 1000)) as shapes:
+            response = self.get_response(request)
+        self.finish(request, shapes)
+        return response
+
+    async def __acall__(self, request):
+        with count_context_queries(QueryShapes(settings.SLOW_QUERY_THRESHOLD_MS / 1000)) as shapes:
+            response = await self.get_response(request)
+        await sync_to_async(self.finish)(request, shapes)
+        return response
+
+    def finish(self, request, shapes):
+        if not shapes.count or not is_watched(request):
+            return
+        try:
+            record_slow_queries(request, shapes)
+        except Exception:
+            # The response is already built; a failure only loses the sample.
+            logger.exception("Could not record slow queries of %s", request.path)
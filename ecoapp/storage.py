@@ -0,0 +1,38 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+
+
+def file_digest(file):
+    """SHA-256 of ``file``: taken from the upload handler when present, otherwise computed."""
+    digest = getattr(file, 'sha256', None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    for chunk in file.chunks():
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def blob_upload_to(instance, filename):
+    # Content-addressed: identical files map to the same name (uploads/blobs/ab/abcd...ext).
+    ext = os.path.splitext(filename)[1].lower()
+    return f'uploads/blobs/{instance.sha256[:2]}/{instance.sha256}{ext}'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Names are content digests, so a name that already exists already holds these bytes."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+
+    def _save(self, name, content):
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+
+def blob_storage():
+    return ContentAddressedStorage()
@@ -0,0 +1,174 @@
+import datetime
+import json
+import logging
+import os
+import socket
+import time
+import traceback
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class TaskHandler:
+    def __init__(self, func, name, batch, max_attempts):
+        self.func = func
+        self.name = name
+        self.batch = batch
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, **payload):
+        return enqueue(self.name, **payload)
+
+
+def task(name, batch=False, max_attempts=None):
+    """
+    Register a task handler. The handler is called with the enqueued keyword arguments,
+    or, with ``batch=True``, once with the list of payloads of every claimed task of that
+    name. Handlers run in a transaction together with the task bookkeeping and may be
+    retried, so they should be idempotent or all-or-nothing.
+    """
+    def decorator(func):
+        handler = TaskHandler(func, name, batch, max_attempts or settings.TASK_MAX_ATTEMPTS)
+        _registry[name] = handler
+        return handler
+    return decorator
+
+
+def get_handler(name):
+    return _registry[name]
+
+
+def enqueue(name, **payload):
+    """
+    Queue a task. The row is part of the current transaction, so work queued by a request
+    that rolls back is dropped with it. With TASKS_EAGER the handler runs inline instead.
+    """
+    handler = get_handler(name)
+    if settings.TASKS_EAGER:
+        # Same JSON round trip as a stored payload, so handlers see the same types.
+        payload = json.loads(json.dumps(payload, cls=DjangoJSONEncoder))
+        try:
+            with transaction.atomic():
+                if handler.batch:
+                    handler([payload])
+                else:
+                    handler(**payload)
+        except Exception:
+            logger.exception("Task %s failed", name)
+        return None
+    return Task.objects.create(name=name, payload=payload, max_attempts=handler.max_attempts)
+
+
+def retry_delay(attempts):
+    """Exponential backoff: TASK_RETRY_DELAY, then twice that, and so on."""
+    return datetime.timedelta(seconds=settings.TASK_RETRY_DELAY * 2 ** max(attempts - 1, 0))
+
+
+class Worker:
+    """
+    Claims due tasks in batches and runs them. Several worker processes can share a
+    queue: claiming is a single UPDATE of queued rows, with SKIP LOCKED where the
+    database supports it (SQLite serialises writers on its own).
+    """
+
+    def __init__(self, batch_size=None, poll_interval=None, names=None):
+        self.batch_size = batch_size or settings.TASK_BATCH_SIZE
+        self.poll_interval = poll_interval or settings.TASK_POLL_INTERVAL
+        self.names = names
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.stopping = False
+
+    def requeue_stale(self):
+        """Put back tasks whose worker died mid-run (locked longer than TASK_LOCK_TIMEOUT)."""
+        cutoff = timezone.now() - datetime.timedelta(seconds=settings.TASK_LOCK_TIMEOUT)
+        return Task.objects.filter(status=Task.RUNNING, locked_at__lt=cutoff).update(status=Task.QUEUED, locked_by='')
+
+    def claim(self):
+        now = timezone.now()
+        due = Task.objects.filter(status=Task.QUEUED, run_at__lte=now)
+        if self.names:
+            due = due.filter(name__in=self.names)
+        with transaction.atomic():
+            if connection.features.has_select_for_update_skip_locked:
+                due = due.select_for_update(skip_locked=True)
+            ids = list(due.order_by('run_at', 'pk').values_list('pk', flat=True)[:self.batch_size])
+            if not ids:
+                return []
+            Task.objects.filter(pk__in=ids, status=Task.QUEUED).update(
+                status=Task.RUNNING, locked_by=self.worker_id, locked_at=now, attempts=F('attempts') + 1,
+            )
+        return list(Task.objects.filter(pk__in=ids, locked_by=self.worker_id, status=Task.RUNNING).order_by('pk'))
+
+    def run_group(self, name, tasks):
+        """Run ``tasks`` of one handler in a transaction; returns how many succeeded."""
+        handler = _registry.get(name)
+        try:
+            if handler is None:
+                raise LookupError(f"No task handler registered as {name!r}")
+            with transaction.atomic():
+                if handler.batch:
+                    handler([task.payload for task in tasks])
+                else:
+                    for task in tasks:
+                        handler(**task.payload)
+                Task.objects.filter(pk__in=[task.pk for task in tasks]).delete()
+        except Exception:
+            if handler is not None and len(tasks) > 1:
+                # Find the bad payloads: run each on its own, so only those are retried.
+                logger.warning("Batch of %d %s tasks failed; running them one by one", len(tasks), name)
+                return sum(self.run_group(name, [task]) for task in tasks)
+            error = traceback.format_exc()
+            logger.exception("Task %s failed (%d tasks)", name, len(tasks))
+            for task in tasks:
+                if task.attempts >= task.max_attempts or handler is None:
+                    changes = {'status': Task.FAILED}
+                else:
+                    changes = {'status': Task.QUEUED, 'run_at': timezone.now() + retry_delay(task.attempts)}
+                Task.objects.filter(pk=task.pk).update(locked_by='', last_error=error, **changes)
+            return 0
+        return len(tasks)
+
+    def run_once(self):
+        """Claim and run one batch; returns ``(succeeded, claimed)``."""
+        self.requeue_stale()
+        groups = defaultdict(list)
+        for task in self.claim():
+            groups[task.name].append(task)
+        done = 0
+        for name, tasks in groups.items():
+            handler = _registry.get(name)
+            if handler is not None and not handler.batch:
+                # One transaction per task, so one failure doesn't roll back its neighbours.
+                for task in tasks:
+                    done += self.run_group(name, [task])
+            else:
+                done += self.run_group(name, tasks)
+        return done, sum(len(tasks) for tasks in groups.values())
+
+    def run(self, burst=False, log=None):
+        """Work until stopped; with ``burst`` return once nothing is due."""
+        log = log or (lambda message: None)
+        while not self.stopping:
+            close_old_connections()
+            done, claimed = self.run_once()
+            if claimed:
+                log(f"{self.worker_id}: {done}/{claimed} tasks done")
+                continue
+            if burst:
+                return
+            time.sleep(self.poll_interval)
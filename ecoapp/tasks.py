@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import send_mail
+from django.urls import reverse
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .datagen import raw_timestamps
+from .models import ContactMessage, LoginActivity, SearchLog, VisitTracker
+from .rollups import add_activity, apply_deltas, new_deltas, record_visits
+from .taskqueue import task
+
+
+@task('ecoapp.record_logins', batch=True)
+def record_logins(payloads):
+    """LoginActivity rows (one per user and day) and their rollups, for a batch of logins."""
+    days = {(payload['user'], parse_date(payload['date'])) for payload in payloads}
+    existing = set(LoginActivity.objects.filter(
+        user_id__in={user_id for user_id, _ in days}, login_date__in={day for _, day in days},
+    ).values_list('user_id', 'login_date'))
+    new = days - existing
+    LoginActivity.objects.bulk_create([LoginActivity(user_id=user_id, login_date=day) for user_id, day in new])
+    deltas = new_deltas()
+    for user_id, day in new:
+        add_activity(deltas, user_id, day, login_days=1)
+    apply_deltas(deltas)
+
+
+@task('ecoapp.record_visits', batch=True)
+def record_visit_batches(payloads):
+    """Buffered visits (see ecoapp.visits), many flushes per INSERT."""
+    visits = [
+        (user_id, ip, agent, parse_datetime(visit_time))
+        for payload in payloads for user_id, ip, agent, visit_time in payload['visits']
+    ]
+    VisitTracker.objects.bulk_create(
+        [VisitTracker(user_id=user_id, ip_address=ip, user_agent=agent, visit_time=visit_time)
+         for user_id, ip, agent, visit_time in visits],
+        batch_size=settings.VISIT_BATCH_SIZE,
+    )
+    record_visits((user_id, visit_time) for user_id, _, _, visit_time in visits)
+
+
+@task('ecoapp.log_searches', batch=True)
+def log_searches(payloads):
+    with raw_timestamps(SearchLog):
+        SearchLog.objects.bulk_create([
+            SearchLog(query=payload['query'], user_id=payload['user'], searched_at=parse_datetime(payload['searched_at']))
+            for payload in payloads
+        ])
+
+
+@task('ecoapp.notify_contact_message')
+def notify_contact_message(message):
+    """Email staff about a new contact message."""
+    message = ContactMessage.objects.filter(pk=message).first()
+    if message is None:
+        return
+    recipients = list(get_user_model()._default_manager.filter(is_staff=True, is_active=True).exclude(email='')
+                      .values_list('email', flat=True))
+    if not recipients:
+        return
+    send_mail(
+        f"Contact: {message.subject}",
+        f"From {message.name} <{message.email}>\n\n{message.message}\n\n"
+        f"{settings.SITE_URL.rstrip('/')}{reverse('admin:ecoapp_contactmessage_change', args=[message.pk])}",
+        None, recipients,
+    )
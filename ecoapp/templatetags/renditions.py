@@ -0,0 +1,19 @@
+from django import template
+
+from ecoapp.renditions import available_renditions
+
+register = template.Library()
+
+
+@register.simple_tag
+def rendition_url(field_file, width):
+    """URL of the narrowest rendition at least ``width`` px wide, else the original."""
+    for rendition_width, url in available_renditions(field_file):
+        if rendition_width >= width:
+            return url
+    return field_file.url if field_file else ''
+
+
+@register.simple_tag
+def rendition_srcset(field_file):
+    return ', '.join(f'{url} {width}w' for width, url in available_renditions(field_file))
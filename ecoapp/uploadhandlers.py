@@ -0,0 +1,54 @@
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import StopUpload, TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+
+
+class HashingFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams every uploaded file straight to a temporary file, hashing each chunk on the
+    way, so memory use stays at one chunk per upload. The SHA-256 digest is available as
+    ``uploaded_file.sha256``. Files over UPLOAD_MAX_SIZE stop the upload as soon as the
+    limit is crossed (or at the first file, when Content-Length is already too large);
+    the reason is left on ``request.upload_error`` for the view to show. Nothing more is
+    written to disk, but the rest of the body is still read and discarded so the browser
+    gets that response. Install it per view (see upload_view), as other views don't
+    report the error.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = settings.UPLOAD_MAX_SIZE
+        self.request_too_large = False
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # The declared length is already over the limit: refuse the first file before
+        # writing any of it (the body is still drained, see _reject).
+        self.request_too_large = bool(self.max_size) and content_length > self.max_size + settings.UPLOAD_FORM_OVERHEAD
+
+    def new_file(self, *args, **kwargs):
+        if self.request_too_large:
+            self._reject()
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+        self.size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.max_size and self.size > self.max_size:
+            self.file.close()
+            self._reject()
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        uploaded.sha256 = self.hasher.hexdigest()
+        return uploaded
+
+    def _reject(self):
+        self.request.upload_error = f"File is too large; the limit is {filesizeformat(self.max_size)}."
+        # Read and discard the rest of the body rather than resetting the connection, so
+        # the browser gets the form back with the error.
+        raise StopUpload(connection_reset=False)
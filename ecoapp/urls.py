@@ -20,6 +20,10 @@ urlpatterns = [
     path('my_uploads/', views.user_uploads_view, name='user_uploads'),
 
     path('search/', views.search_view, name='search'),
+    path('search/autocomplete/', views.search_autocomplete_view, name='search_autocomplete'),
+    path('search/cache-stats/', views.search_cache_stats_view, name='search_cache_stats'),
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('profile/token/', views.profile_token_view, name='profile_token'),
     path('feedback/', views.feedback_view, name='feedback'),
 
     # Use only one team list view: either function-based or class-based.
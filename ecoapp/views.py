@@ -1,3 +1,8 @@
+import asyncio
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import TemplateView, ListView, DetailView, View, DeleteView
 from django.contrib.auth import login, get_user_model
@@ -5,25 +10,38 @@ from django.contrib.auth.views import LoginView as DjangoLoginView, LogoutView
 from django.urls import reverse_lazy
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import Sum
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
-from django.utils.decorators import method_decorator
+from django.utils.decorators import method_decorator, sync_and_async_middleware
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 
 from .models import (
-    LoginActivity, TeamMember, SiteSettings, EcoAction, Upload,
-    Feedback, ContactMessage, SearchLog, UserHistory, VisitTracker, Event
+    LoginActivity, TeamMember, SiteSettings, EcoAction, Upload, Category,
+    Feedback, ContactMessage, SearchLog, UserHistory, VisitTracker, Event, ActivityRollup
 )
 from .forms import (
     RegisterForm, UploadForm, EcoActionForm, FeedbackForm,
     ContactForm, TeamMemberForm, SiteSettingsForm, SearchForm,
     CustomPasswordRequestForm, CustomPasswordResetForm, EventForm
 )
+from .search import asearch
+from .pagination import KeysetPaginationMixin, keyset_paginate, wants_fragment
+from .querybudget import query_budget
+from .uploadhandlers import HashingFileUploadHandler
+from .visits import get_visit_buffer
+from .counters import get_counter
+from .autocomplete import get_query_index
+from .caching import cache_public_page, search_cache
+from .metrics import render_prometheus
+from .tasks import log_searches, notify_contact_message
+from .profiling import MODES as PROFILE_MODES, PROFILE_HEADER, PROFILE_PARAM, make_profile_token
 
 User = get_user_model()
 
 # Home View
+@method_decorator(cache_public_page(), name='dispatch')
 class HomeView(TemplateView):
     template_name = 'ecoapp/home.html'
 
@@ -87,10 +105,20 @@ class CustomPasswordResetView(View):
         return render(request, 'ecoapp/custom_password_reset.html', {'form': form})
 
 # Upload View
+@csrf_exempt
 @login_required
 def upload_view(request):
+    # Upload handlers must be set before anything reads request.POST, CsrfViewMiddleware
+    # included; CSRF is checked below instead.
+    request.upload_handlers = [HashingFileUploadHandler(request)]
+    return _upload_view(request)
+
+@csrf_protect
+def _upload_view(request):
     if request.method == 'POST':
         form = UploadForm(request.POST, request.FILES)
+        if getattr(request, 'upload_error', None):
+            form.add_error('file', request.upload_error)
         if form.is_valid():
             upload = form.save(commit=False)
             upload.user = request.user
@@ -102,13 +130,19 @@ def upload_view(request):
     return render(request, 'ecoapp/upload.html', {'form': form})
 
 # EcoAction Views
-class ActionListView(ListView):
-    model = EcoAction
+@method_decorator(cache_public_page(EcoAction, Category), name='dispatch')
+@method_decorator(query_budget(5), name='dispatch')
+class ActionListView(KeysetPaginationMixin, ListView):
+    queryset = EcoAction.objects.select_related('category')
     template_name = 'ecoapp/action_list.html'
+    fragment_template_name = 'ecoapp/partials/action_items.html'
     context_object_name = 'actions'
+    keyset_field = 'created_at'
 
+@method_decorator(cache_public_page(EcoAction, Category), name='dispatch')
+@method_decorator(query_budget(5), name='dispatch')
 class ActionDetailView(DetailView):
-    model = EcoAction
+    queryset = EcoAction.objects.select_related('category', 'user')
     template_name = 'ecoapp/action_detail.html'
     context_object_name = 'action'
 
@@ -117,7 +151,8 @@ def contact_view(request):
     if request.method == 'POST':
         form = ContactForm(request.POST)
         if form.is_valid():
-            form.save()  # Save message in DB
+            contact_message = form.save()  # Save message in DB
+            notify_contact_message.enqueue(message=contact_message.pk)
             messages.success(request, "Thank you for your message! We will get back to you soon.")
             return redirect('ecoapp:contact')
     else:
@@ -127,8 +162,10 @@ def contact_view(request):
 # User History View
 @login_required
 def user_history_view(request):
-    login_activities = LoginActivity.objects.filter(user=request.user).order_by('-login_date')
-    total_logins = login_activities.count()
+    # Read pre-aggregated rollups instead of scanning LoginActivity
+    login_rollups = ActivityRollup.objects.filter(user=request.user, login_days__gt=0)
+    login_dates = login_rollups.filter(period='day').order_by('-period_start').values_list('period_start', flat=True)
+    total_logins = login_rollups.filter(period='month').aggregate(total=Sum('login_days'))['total'] or 0
 
     visit_count = int(request.COOKIES.get('visit_count', 0)) + 1
     last_visit = request.COOKIES.get('last_visit', 'First Visit')
@@ -137,7 +174,7 @@ def user_history_view(request):
 
     response = render(request, 'ecoapp/user_history.html', {
         'total_logins': total_logins,
-        'login_dates': [activity.login_date for activity in login_activities],
+        'login_dates': list(login_dates),
         'visit_count': visit_count,
         'last_visit': last_visit,
         'current_time': current_time.strftime('%Y-%m-%d %H:%M:%S'),
@@ -148,16 +185,28 @@ def user_history_view(request):
     response.set_cookie('last_visit', current_time.strftime('%Y-%m-%d %H:%M:%S'), max_age=60*60*24*30)
     return response
 
-# Visit Tracker Middleware
+# Visit Tracker Middleware (sync and async, so ASGI requests don't hop threads)
+@sync_and_async_middleware
 def track_visit(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            user = await request.auser()
+            if user.is_authenticated:
+                buffer = get_visit_buffer()
+                args = (user.pk, get_client_ip(request), request.META.get('HTTP_USER_AGENT', ''))
+                if buffer.background:
+                    buffer.record(*args)
+                else:
+                    # Without the flush thread, record() may write to the database inline
+                    await sync_to_async(buffer.record)(*args)
+            return await get_response(request)
+        return middleware
+
     def middleware(request):
         ip = get_client_ip(request)
         if request.user.is_authenticated:
-            VisitTracker.objects.create(
-                user=request.user,
-                ip_address=ip,
-                user_agent=request.META.get('HTTP_USER_AGENT', '')
-            )
+            # Buffered and written in batches (see ecoapp.visits)
+            get_visit_buffer().record(request.user.pk, ip, request.META.get('HTTP_USER_AGENT', ''))
         return get_response(request)
     return middleware
 
@@ -166,6 +215,7 @@ def get_client_ip(request):
     return x_forwarded_for.split(',')[0] if x_forwarded_for else request.META.get('REMOTE_ADDR')
 
 # Team Views
+@method_decorator(cache_public_page(TeamMember), name='dispatch')
 class TeamListView(ListView):
     model = TeamMember
     template_name = 'ecoapp/team_list.html'
@@ -224,49 +274,70 @@ def site_settings_edit(request):
         form = SiteSettingsForm(instance=settings)
     return render(request, 'ecoapp/site_settings_form.html', {'form': form})
 
-# Search View
-def search_view(request):
+# Search View (async, so waiting on the database doesn't hold a worker thread; the ORM
+# calls still run one after another on the thread-sensitive executor)
+@query_budget(12)
+async def search_view(request):
     form = SearchForm(request.GET or None)
     eco_actions = []
     uploads = []
     events = []
     query = ''
+    user = await request.auser()
 
     if form.is_valid():
         query = form.cleaned_data['query']
-        
-        # Search for EcoActions based on query
-        eco_actions = EcoAction.objects.filter(
-            Q(title__icontains=query) | Q(description__icontains=query)
+
+        # Ranked full-text lookups (see ecoapp.search); uploads are limited to the user's own
+        # files, and asearch returns none without an owner
+        eco_actions, uploads, events = await asyncio.gather(
+            asearch(EcoAction, query),
+            asearch(Upload, query, owner=user if user.is_authenticated else None),
+            asearch(Event, query),
         )
-        
-        # Search for User's Own Uploads
-        if request.user.is_authenticated:
-            uploads = Upload.objects.filter(
-                Q(title__icontains=query) | Q(description__icontains=query),
-                user=request.user  # Filter uploads by the logged-in user
-            )
-        
-        # Search for Events based on query
-        events = Event.objects.filter(
-            Q(title__icontains=query) | 
-            Q(description__icontains=query) | 
-            Q(location__icontains=query) |
-            Q(city__icontains=query)
-        ).order_by('-date')
 
         if query.strip():
-            SearchLog.objects.create(
-                user=request.user if request.user.is_authenticated else None, 
-                query=query
+            # Logged by the task worker (ecoapp.tasks)
+            await sync_to_async(log_searches.enqueue)(
+                query=query, user=user.pk if user.is_authenticated else None, searched_at=timezone.now(),
             )
 
-    return render(request, 'ecoapp/search.html', {
+    # Templates and context processors are synchronous
+    return await sync_to_async(render)(request, 'ecoapp/search.html', {
         'form': form,
         'actions': eco_actions,
         'uploads': uploads,  # Display only the logged-in user's uploads
         'events': events,
         'query': query,
+        'fragment_cache_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
+    })
+
+# Search autocomplete: answered from the in-memory query index, no database access
+async def search_autocomplete_view(request):
+    prefix = request.GET.get('q', '')[:255]
+    # Only the first build (per process) reads the database
+    index = await sync_to_async(get_query_index)()
+    suggestions = index.suggest(prefix, limit=settings.AUTOCOMPLETE_LIMIT)
+    return JsonResponse({'query': prefix, 'suggestions': suggestions})
+
+@staff_member_required
+def search_cache_stats_view(request):
+    return JsonResponse(search_cache.stats())
+
+@staff_member_required
+def metrics_view(request):
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@staff_member_required
+def profile_token_view(request):
+    mode = request.GET.get('mode', 'cprofile')
+    if mode not in PROFILE_MODES:
+        return JsonResponse({'error': f"mode must be one of {', '.join(PROFILE_MODES)}"}, status=400)
+    return JsonResponse({
+        'token': make_profile_token(request.user, mode),
+        'param': PROFILE_PARAM,
+        'header': PROFILE_HEADER,
+        'expires_in': settings.PROFILE_TOKEN_MAX_AGE,
     })
 
 # Feedback View
@@ -285,27 +356,39 @@ def feedback_view(request):
 
 # User Uploads View
 @login_required
+@query_budget(5)
 def user_uploads_view(request):
-    user_uploads = Upload.objects.filter(user=request.user).order_by('-uploaded_at')
-    return render(request, 'ecoapp/user_uploads.html', {'uploads': user_uploads})
+    page = keyset_paginate(Upload.objects.filter(user=request.user), 'uploaded_at', request.GET.get('cursor'))
+    template = 'ecoapp/partials/upload_items.html' if wants_fragment(request) else 'ecoapp/user_uploads.html'
+    return render(request, template, {'uploads': page, 'page_obj': page})
 
 # ----------- Event Views --------------
 
-class EventListView(ListView):
+@method_decorator(cache_public_page(Event, Category), name='dispatch')
+@method_decorator(query_budget(5), name='dispatch')
+class EventListView(KeysetPaginationMixin, ListView):
     model = Event
     template_name = 'ecoapp/event_list.html'
+    fragment_template_name = 'ecoapp/partials/event_cards.html'
     context_object_name = 'events'
-    ordering = ['-date']
+    keyset_field = 'date'
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['today'] = timezone.localdate()
+        context['fragment_cache_timeout'] = settings.FRAGMENT_CACHE_TIMEOUT
+        return context
+
+@method_decorator(query_budget(8), name='dispatch')
 class EventDetailView(DetailView):
-    model = Event
+    queryset = Event.objects.select_related('user')
     template_name = 'ecoapp/event_detail.html'
     context_object_name = 'event'
 
     def get_object(self, queryset=None):
         obj = super().get_object(queryset)
-        obj.views += 1
-        obj.save()
+        # obj.views was read before any flush the increment triggers
+        obj.views += get_counter(Event, 'views').increment(obj.pk)
         return obj
 
 @login_required
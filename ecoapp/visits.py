@@ -0,0 +1,109 @@
+import atexit
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .taskqueue import enqueue
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT_MAX_LENGTH = 512
+
+
+class VisitBuffer:
+    """
+    Collects visits in memory and hands them to the task queue in batches.
+
+    The buffer is a bounded ring: once ``max_size`` visits are pending the oldest are
+    dropped (and counted in ``dropped``) rather than letting memory grow. Visits are
+    flushed when ``batch_size`` are pending or ``flush_interval`` seconds have passed,
+    either inline by the recording request or by a background thread.
+    """
+
+    def __init__(self, max_size=10000, batch_size=200, flush_interval=5.0, sample_rate=1.0, background=False):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sample_rate = sample_rate
+        self.background = background
+        self.dropped = 0
+        self._visits = deque(maxlen=max_size)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._wakeup = threading.Event()
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._run, name='visit-buffer', daemon=True)
+            self._thread.start()
+
+    def __len__(self):
+        return len(self._visits)
+
+    def record(self, user_id, ip_address, user_agent=''):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        visit = (user_id, ip_address, user_agent[:USER_AGENT_MAX_LENGTH], timezone.now())
+        with self._lock:
+            if len(self._visits) == self._visits.maxlen:
+                self.dropped += 1
+            self._visits.append(visit)
+            pending = len(self._visits)
+        if pending >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            if self.background:
+                self._wakeup.set()
+            else:
+                self.flush()
+
+    def flush(self):
+        # Only one flush at a time; a concurrent caller just leaves the work to it.
+        if not self._flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            with self._lock:
+                visits = list(self._visits)
+                self._visits.clear()
+                self._last_flush = time.monotonic()
+            if not visits:
+                return 0
+            try:
+                # One task row per flush; the worker writes the visits and rollups (ecoapp.tasks)
+                enqueue('ecoapp.record_visits', visits=visits)
+            except Exception:
+                logger.exception("Dropping %d buffered visits after a failed flush", len(visits))
+                return 0
+            return len(visits)
+        finally:
+            self._flush_lock.release()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_visit_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = VisitBuffer(
+                    max_size=settings.VISIT_BUFFER_SIZE,
+                    batch_size=settings.VISIT_BATCH_SIZE,
+                    flush_interval=settings.VISIT_FLUSH_INTERVAL,
+                    sample_rate=settings.VISIT_SAMPLE_RATE,
+                    background=settings.VISIT_FLUSH_THREAD,
+                )
+                atexit.register(_buffer.flush)
+    return _buffer
@@ -1,14 +1,27 @@
 import os
 from pathlib import Path
 from django.contrib.messages import constants as messages  # ✅ Added for MESSAGE_TAGS
+from django.core.exceptions import ImproperlyConfigured
+
+from .env import cache_from_url, database_from_url, env_bool, env_int, env_list, env_str
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-SECRET_KEY = 'your-secret-key-here'  # replace with your secret key or use env var
+# Profile: 'dev' (the default: a laptop with SQLite and DEBUG on) or 'prod'. Every value
+# below can be overridden from the environment; 'prod' only changes the defaults.
+PROFILE = env_str('DJANGO_PROFILE', 'dev')
+if PROFILE not in ('dev', 'prod'):
+    raise ImproperlyConfigured(f"DJANGO_PROFILE must be 'dev' or 'prod', not {PROFILE!r}")
+PRODUCTION = PROFILE == 'prod'
+
+SECRET_KEY = env_str('DJANGO_SECRET_KEY', None if PRODUCTION else 'your-secret-key-here')
+if not SECRET_KEY:
+    raise ImproperlyConfigured("DJANGO_SECRET_KEY is required in the prod profile")
 
-DEBUG = True
+DEBUG = env_bool('DJANGO_DEBUG', not PRODUCTION)
 
-ALLOWED_HOSTS = ['localhost', '127.0.0.1']
+ALLOWED_HOSTS = env_list('DJANGO_ALLOWED_HOSTS', [] if PRODUCTION else ['localhost', '127.0.0.1'])
+CSRF_TRUSTED_ORIGINS = env_list('DJANGO_CSRF_TRUSTED_ORIGINS')
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -21,6 +34,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Writes its findings after the response is built, outside the timings below
+    'ecoapp.slowqueries.SlowQueryMiddleware',
+    # Early, so its timings cover the rest of the stack
+    'ecoapp.metrics.MetricsMiddleware',
+    'ecoapp.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -34,10 +52,18 @@ ROOT_URLCONF = 'greenworld.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that reports render time to ecoapp.metrics
+        'BACKEND': 'ecoapp.metrics.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'ecoapp' / 'templates'],  # your templates folder
-        'APP_DIRS': True,
+        'APP_DIRS': False,
         'OPTIONS': {
+            # Compile each template once per process and reuse it for every render
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -51,13 +77,126 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'greenworld.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite tuned for concurrent workers: WAL lets readers run alongside the single writer,
+# BEGIN IMMEDIATE takes the write lock up front (no deadlock-prone lock upgrades), and
+# writers wait up to `timeout` seconds for the lock instead of failing with "database is locked".
+# WAL is persistent, so migration 0017 sets it once; these pragmas are per connection.
+# IMMEDIATE applies to every atomic() block, read-only ones included: keep reads outside
+# transactions (as the search and rollup code does) so they don't queue for the write lock.
+SQLITE_PRAGMAS = {
+    'synchronous': 'NORMAL',      # durable at checkpoints; safe with WAL
+    'mmap_size': 134217728,       # 128 MB of the file memory-mapped for reads
+    'cache_size': -20000,         # ~20 MB page cache per connection
+    'temp_store': 'MEMORY',
+}
+SQLITE_OPTIONS = {
+    'init_command': ''.join(f'PRAGMA {name}={value};' for name, value in SQLITE_PRAGMAS.items()),
+    'timeout': 20,
+    'transaction_mode': 'IMMEDIATE',
+}
+
+# DATABASE_URL=postgres://... switches to PostgreSQL; DATABASE_POOL=1 uses psycopg's pool
+# instead of persistent connections (CONN_MAX_AGE).
+CONN_MAX_AGE = env_int('DATABASE_CONN_MAX_AGE', 600)   # reuse connections across requests
+if env_str('DATABASE_URL'):
+    DATABASES = {
+        'default': database_from_url(env_str('DATABASE_URL'), CONN_MAX_AGE, pool=env_bool('DATABASE_POOL')),
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': env_str('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': SQLITE_OPTIONS,
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+
+# Optional read replica: reads outside transactions go there. DATABASE_REPLICA_URL for
+# PostgreSQL, DATABASE_REPLICA_PATH for SQLite (e.g. a LiteFS/Litestream copy).
+if env_str('DATABASE_REPLICA_URL'):
+    DATABASES['replica'] = {
+        **database_from_url(env_str('DATABASE_REPLICA_URL'), CONN_MAX_AGE, pool=env_bool('DATABASE_POOL')),
+        'TEST': {'MIRROR': 'default'},
+    }
+elif env_str('DATABASE_REPLICA_PATH'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': env_str('DATABASE_REPLICA_PATH'),
+        'TEST': {'MIRROR': 'default'},
     }
+if 'replica' in DATABASES:
+    DATABASE_ROUTERS = ['ecoapp.routers.ReplicaRouter']
+DATABASE_REPLICA_ALIAS = 'replica'
+
+# CACHE_URL picks the backend: locmem:// (per process, the default), redis://host:6379/1,
+# memcached://host:11211, db://table or file:///path. Use a shared backend on more than
+# one host, or page/settings invalidations only reach the process that made the change.
+CACHES = {
+    'default': cache_from_url(env_str('CACHE_URL', 'locmem://greenworld')),
 }
 
+# SiteSettings caching (seconds): shared cache entry lifetime and per-process copy lifetime.
+# A change reaches every worker within SITE_SETTINGS_CACHE_TIMEOUT + SITE_SETTINGS_LOCAL_TTL.
+SITE_SETTINGS_CACHE_TIMEOUT = 60
+SITE_SETTINGS_LOCAL_TTL = 5
+
+# Rendered public pages (home, team, action and event lists); see ecoapp.caching.cache_public_page
+PUBLIC_PAGE_CACHE_TIMEOUT = 300          # anonymous visitors share one copy per URL
+PUBLIC_PAGE_CACHE_AUTH_TIMEOUT = 60      # per-user copies for signed-in users; 0 disables
+
+# Per-object cards ({% cache %} keyed on pk + updated_at; views pass this timeout). The timeout bounds how long
+# related data the key doesn't cover (usernames, category names, new renditions) stays stale.
+FRAGMENT_CACHE_TIMEOUT = 600
+
+# Visit tracking (ecoapp.views.track_visit): visits are buffered in memory and bulk inserted.
+VISIT_SAMPLE_RATE = 1.0       # fraction of authenticated requests recorded
+VISIT_BUFFER_SIZE = 10000     # max pending visits per process; oldest are dropped beyond this
+VISIT_BATCH_SIZE = 200        # flush once this many are pending...
+VISIT_FLUSH_INTERVAL = 5      # ...or this many seconds after the last flush
+VISIT_FLUSH_THREAD = True     # flush from a background thread instead of the request
+
+# Event view counters are coalesced in memory and written as views = views + n.
+VIEW_COUNTER_FLUSH_INTERVAL = 10
+VIEW_COUNTER_FLUSH_THRESHOLD = 100
+
+# Search autocomplete index built from SearchLog / SearchQueryCount
+AUTOCOMPLETE_REFRESH_INTERVAL = 300   # seconds between background rebuilds
+AUTOCOMPLETE_MAX_QUERIES = 20000      # most frequent queries kept in memory
+AUTOCOMPLETE_LIMIT = 8
+AUTOCOMPLETE_MIN_COUNT = 3            # searches before a query is suggested to anyone
+
+# Per-process search result cache (ecoapp.caching.SearchResultCache). Saves invalidate
+# the local process immediately; other workers converge within SEARCH_CACHE_TTL seconds.
+SEARCH_CACHE_MAX_ENTRIES = 2000
+SEARCH_CACHE_TTL = 60
+
+# Per-view request metrics (ecoapp.metrics), kept in memory per process and exposed to
+# staff in Prometheus text format at /metrics/. Each worker reports its own numbers.
+METRICS_ENABLED = env_bool('DJANGO_METRICS_ENABLED', True)
+
+# On-demand profiling of single requests (ecoapp.profiling); staff fetch a token from
+# /profile/token/ and send it as ?_profile=<token> or an X-Profile-Token header.
+PROFILE_TOKEN_MAX_AGE = 3600       # seconds a token stays valid
+PROFILE_SAMPLE_INTERVAL = 0.005    # seconds between stack samples in "sample" mode
+PROFILE_REPORT_LINES = 60          # functions (cProfile) or stacks (sampling) in the report
+PROFILE_STACK_DEPTH = 6            # project frames kept per logged query
+PROFILE_MAX_QUERIES = 2000         # queries logged per profile (all are counted)
+PROFILE_KEEP = 200                 # most recent profiles kept
+
+# Slow-query log (ecoapp.slowqueries): statements of SLOW_QUERY_APPS views that are slow,
+# or whose shape runs many times in one request (N+1), are aggregated into SlowQuery
+# rows by fingerprint, in memory first and written out every SLOW_QUERY_FLUSH_INTERVAL
+# seconds. See the admin or `manage.py slow_query_report`.
+SLOW_QUERY_APPS = ['ecoapp']
+SLOW_QUERY_THRESHOLD_MS = env_int('DJANGO_SLOW_QUERY_MS', 100)
+SLOW_QUERY_REPEAT_THRESHOLD = 10   # same shape this many times in one request
+SLOW_QUERY_EXPLAIN = True          # store the plan of slow SELECTs
+SLOW_QUERY_BUFFER_SIZE = 1000      # max pending (view, fingerprint) aggregates per process
+SLOW_QUERY_FLUSH_INTERVAL = 10     # seconds between writes to SlowQuery
+SLOW_QUERY_FLUSH_THREAD = True     # write from a background thread instead of the request
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -82,12 +221,79 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
+STATIC_ROOT = env_str('DJANGO_STATIC_ROOT', BASE_DIR / 'staticfiles')
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
+MEDIA_ROOT = env_str('DJANGO_MEDIA_ROOT', BASE_DIR / 'media')
+
+# With DEBUG off, collectstatic writes hashed file names so they can be cached forever.
+# It must run before starting the server (`manage.py collectstatic --noinput`): until the
+# manifest exists every {% static %} raises. The files in STATIC_ROOT are then served by
+# the front-end server, or by ecoapp.media.serve_static with DJANGO_SERVE_STATIC=1.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+        else 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage',
+    },
+}
+
+# Media is served by ecoapp.media.serve_media (conditional GETs, byte ranges).
+# Set one of the offload options to let the front-end server send the bytes.
+SERVE_MEDIA = True
+SERVE_STATIC = env_bool('DJANGO_SERVE_STATIC', False) and not DEBUG  # with DEBUG, runserver serves them
+MEDIA_CACHE_MAX_AGE = 3600               # seconds; content-addressed blobs are cached for a year
+MEDIA_ACCEL_REDIRECT_PREFIX = env_str('MEDIA_ACCEL_REDIRECT_PREFIX')  # e.g. '/protected-media/' (nginx internal location)
+MEDIA_SENDFILE_HEADER = env_str('MEDIA_SENDFILE_HEADER')              # e.g. 'X-Sendfile' (Apache mod_xsendfile, lighttpd)
+
+# Uploads stream to disk; nothing is buffered in memory. upload_view adds its own
+# hashing handler, which also enforces UPLOAD_MAX_SIZE there.
+FILE_UPLOAD_HANDLERS = ['django.core.files.uploadhandler.TemporaryFileUploadHandler']
+UPLOAD_MAX_SIZE = 10 * 1024 * 1024   # bytes per file on upload_view (upload.html advertises 10MB)
+UPLOAD_FORM_OVERHEAD = 64 * 1024     # allowance for the other form fields in a request
+
+# Resized WebP copies of uploaded images, generated after upload (ecoapp.renditions)
+RENDITION_WIDTHS = (160, 320, 640, 1280)
+RENDITION_QUALITY = 80
+RENDITION_WORKERS = 2
+RENDITION_ASYNC = True   # False: generate inline after commit (no worker pool)
+
+# Database-backed task queue (ecoapp.taskqueue) for bookkeeping writes: login activity,
+# visits, search logs, contact notifications. Run `manage.py runworker` next to the web
+# processes; with TASKS_EAGER (the dev default) tasks run inline instead.
+TASKS_EAGER = env_bool('DJANGO_TASKS_EAGER', not PRODUCTION)
+TASK_BATCH_SIZE = 200       # tasks claimed at once; batch handlers get them in one call
+TASK_POLL_INTERVAL = 1.0    # seconds an idle worker waits before polling again
+TASK_MAX_ATTEMPTS = 5
+TASK_RETRY_DELAY = 10       # seconds before the first retry, doubling after each failure
+TASK_LOCK_TIMEOUT = 600     # running tasks older than this are assumed orphaned and requeued
+
+# Retention (ecoapp.retention): `manage.py archive_logs` moves log rows older than
+# RETENTION_DAYS into ARCHIVE_ROOT/<log>/<YYYY-MM>.jsonl.gz and deletes them in chunks.
+ARCHIVE_ROOT = env_str('DJANGO_ARCHIVE_ROOT', str(BASE_DIR / 'archive'))
+RETENTION_DAYS = {
+    'visits': 90,
+    'searches': 180,
+    'logins': 365,
+}
+ARCHIVE_CHUNK_SIZE = 2000    # rows written and deleted per short transaction
+ARCHIVE_PAUSE = 0.05         # seconds between chunks, so request writes get the database
+
+# Staff notifications (contact messages) go through this backend
+EMAIL_BACKEND = env_str('DJANGO_EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend' if PRODUCTION
+                        else 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = env_str('DJANGO_DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+SITE_URL = env_str('DJANGO_SITE_URL', 'http://localhost:8000')  # scheme and host for links in emails
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+if PRODUCTION:
+    SESSION_COOKIE_SECURE = env_bool('DJANGO_SECURE_COOKIES', True)
+    CSRF_COOKIE_SECURE = SESSION_COOKIE_SECURE
+    # Only behind a proxy that sets (and strips client-sent) X-Forwarded-Proto.
+    if env_bool('DJANGO_BEHIND_PROXY', False):
+        SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+
 LOGIN_REDIRECT_URL = 'ecoapp:home'
 LOGOUT_REDIRECT_URL = 'ecoapp:login'
 